@@ -3,13 +3,27 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 import math
+import csv
+import io
+
+TRANSACTIONS_PAGE_SIZE = 50
+SUMMARY_MONTHS = 24
 
 # Set page config immediately after imports
 st.set_page_config(page_title="Money Tracker", layout="wide")
 
-from db.crud import add_transaction, get_transactions, delete_transaction, get_categories
-from db.crud import add_savings_goal, get_savings_goals, update_savings_goal, delete_savings_goal, get_savings_total, get_savings_total_by_goal
+from db.crud import add_transaction, get_dashboard, get_data_versions, get_transactions_page, search_transactions, delete_transaction, get_categories, get_summary
+from db.crud import add_savings_goal, get_savings_goals, update_savings_goal, delete_savings_goal
 from db.auth import authenticate_user, create_user
+from db.importer import DEFAULT_DATE_FORMAT, ImportFormatError, import_csv
+from db.exporter import EXPORTERS
+from db.listener import start_listener
+from db.metrics import mark_section, rerun_elapsed_ms, rerun_stats, section_times, start_rerun
+
+# Query stats are collected per rerun from here on
+start_rerun()
+# Keeps this process's caches in step with writes made by other processes
+start_listener()
 
 # -----------------------------
 # SESSION STATE INIT
@@ -18,6 +32,12 @@ if "user_id" not in st.session_state:
     st.session_state.user_id = None
 if "user_email" not in st.session_state:
     st.session_state.user_email = None
+if "tx_page_cursors" not in st.session_state:
+    # (date, id) of the last row of every page before the current one
+    st.session_state.tx_page_cursors = [None]
+if "section_data" not in st.session_state:
+    # Section name -> (query arguments and data versions, result); see load()
+    st.session_state.section_data = {}
 
 # -----------------------------
 # SIDEBAR (Logout & User Info)
@@ -34,6 +54,10 @@ with st.sidebar:
             st.session_state.user_email = None
             st.rerun()
 
+        st.checkbox("🛠 Performance panel", key="perf_panel")
+        # Filled in at the end of the script, once the rerun has been measured
+        perf_placeholder = st.empty()
+
 # -----------------------------
 # LOGIN / REGISTER FLOW
 # -----------------------------
@@ -73,117 +97,358 @@ if not st.session_state.user_id:
 
 st.markdown("<h1 style='text-align: center; color: white;'>💰PERSONEL MONEY TRACKER 💰</h1>", unsafe_allow_html=True)
 
-# Load categories
-categories = get_categories()
-category_dict = {name: cid for cid, name in categories}
-savings_goal_dict = {row[1]: row[0] for row in get_savings_goals()}
-goals = get_savings_goals()
-savings_goal_dict = {g[1]: g[0] for g in goals}
+user_id = st.session_state.user_id
+
+
+def section_key(versions, entities, args, kwargs):
+    # Keyword arguments set to None or "" are left out, as the queries ignore them
+    given = {k: v for k, v in kwargs.items() if v is not None and v != ""}
+    return (tuple(versions.get(entity, 0) for entity in entities), args, given)
+
+
+def load(name, entities, func, *args, **kwargs):
+    """Run a section's query, or reuse this session's last result for it.
+
+    The result is kept while the arguments and the user's data versions for
+    `entities` are unchanged, so a rerun after a write only queries again
+    for the sections whose data the write touched. Versions live in the
+    database, so writes from other sessions and processes count too.
+    During a full render, versions and any matching result come from the
+    dashboard fetched up front instead.
+    """
+    dashboard = st.session_state.get("dashboard")
+    versions = dashboard["versions"] if dashboard else get_data_versions(user_id)
+    key = section_key(versions, entities, args, kwargs)
+    memo = st.session_state.section_data
+    if name not in memo or memo[name][0] != key:
+        prefetched = dashboard["prefetched"].get(name) if dashboard else None
+        if prefetched is not None and prefetched[0] == key:
+            memo[name] = prefetched
+        else:
+            memo[name] = (key, func(*args, **kwargs))
+    return memo[name][1]
+
+
+def load_dashboard():
+    # Everything a default render shows, in one round trip; load() picks up
+    # the default transactions page and this month's summary from here
+    this_month = date.today().replace(day=1)
+    next_month = (this_month + pd.DateOffset(months=1)).date()
+    dashboard = get_dashboard(user_id, this_month, TRANSACTIONS_PAGE_SIZE + 1)
+    versions = dashboard["versions"]
+    dashboard["prefetched"] = {
+        "Transactions table": (
+            section_key(versions, ("transactions",), (user_id, TRANSACTIONS_PAGE_SIZE + 1), {}),
+            dashboard["transactions"]
+        ),
+        "Summary": (
+            section_key(versions, ("transactions",), (user_id, this_month, next_month), {}),
+            dashboard["summary"]
+        ),
+    }
+    return dashboard
+
+
+def page_categories():
+    dashboard = st.session_state.get("dashboard")
+    return dashboard["categories"] if dashboard else get_categories()
+
+
+def page_goals():
+    dashboard = st.session_state.get("dashboard")
+    return dashboard["goals"] if dashboard else get_savings_goals(user_id)
+
+# Each section below is a fragment: using its widgets reruns only that
+# section. Writes rerun the whole page, since other sections show the data
+# they change; load() keeps that cheap for the sections they did not.
 
 # Add transaction form
-st.subheader("➕ Add New Transaction")
+@st.fragment
+def add_transaction_section():
+    mark_section("Add form")
+    category_dict = {name: cid for cid, name in page_categories()}
+    goals = page_goals()
+    savings_goal_dict = {g[1]: g[0] for g in goals}
 
-with st.form("add_transaction_form"):
-    col1, col2, col3 = st.columns(3)
+    st.subheader("➕ Add New Transaction")
 
-    with col1:
-        date = st.date_input("Date")
-        amount = st.number_input("Amount", min_value=0.0, format="%.2f")
+    with st.form("add_transaction_form"):
+        col1, col2, col3 = st.columns(3)
 
-    with col2:
-        tx_type = st.selectbox("Type", ["Income", "Expense"])
-        category = st.selectbox("Category", category_dict.keys())
+        with col1:
+            tx_date = st.date_input("Date")
+            amount = st.number_input("Amount", min_value=0.0, format="%.2f")
 
-    with col3:
-        savings_goal = st.selectbox("Savings Goal", ["None"] + [g[1] for g in get_savings_goals()])
-        description = st.text_input("Description")
+        with col2:
+            tx_type = st.selectbox("Type", ["Income", "Expense"])
+            category = st.selectbox("Category", category_dict.keys())
 
-    submitted = st.form_submit_button("Add Transaction")
+        with col3:
+            savings_goal = st.selectbox("Savings Goal", ["None"] + [g[1] for g in goals])
+            description = st.text_input("Description")
 
-    if submitted:
-        # Handle "None" selection for savings goal
-        selected_goal_id = savings_goal_dict[savings_goal] if savings_goal != "None" else None
-        
-        add_transaction(
-            date=date,
-            amount=amount,
-            tx_type=tx_type,
-            savings_goal_id=selected_goal_id,
-            category_id=category_dict[category],
-            description=description
-        )
-        st.success('Transaction added!', icon="✅")
-        st.rerun()
+        submitted = st.form_submit_button("Add Transaction")
+
+        if submitted:
+            # Handle "None" selection for savings goal
+            selected_goal_id = savings_goal_dict[savings_goal] if savings_goal != "None" else None
+
+            add_transaction(
+                user_id=user_id,
+                date=tx_date,
+                amount=amount,
+                tx_type=tx_type,
+                savings_goal_id=selected_goal_id,
+                category_id=category_dict[category],
+                description=description
+            )
+            st.session_state.tx_page_cursors = [None]
+            st.success('Transaction added!', icon="✅")
+            st.rerun()
+
+# Import transactions from a CSV bank statement
+@st.fragment
+def import_section():
+    with st.expander("📥 Import Transactions from CSV"):
+        uploaded = st.file_uploader("Bank statement (CSV)", type="csv")
+        if uploaded is None:
+            return
+        # Only the header row is read here; the import itself streams the file
+        try:
+            csv_columns = next(csv.reader([uploaded.readline().decode("utf-8-sig")]), [])
+        except (UnicodeDecodeError, csv.Error):
+            st.error("Could not read the header row. Save the statement as UTF-8 CSV and upload it again.")
+            return
+        uploaded.seek(0)
+        optional_columns = ["(none)"] + csv_columns
+
+        def guess_column(options, field):
+            lowered = [c.lower() for c in options]
+            return lowered.index(field) if field in lowered else 0
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            date_column = st.selectbox("Date column", csv_columns, index=guess_column(csv_columns, "date"))
+            amount_column = st.selectbox("Amount column", csv_columns, index=guess_column(csv_columns, "amount"))
+        with col2:
+            type_column = st.selectbox("Type column", optional_columns, index=guess_column(optional_columns, "type"))
+            category_column = st.selectbox("Category column", optional_columns, index=guess_column(optional_columns, "category"))
+        with col3:
+            description_column = st.selectbox("Description column", optional_columns, index=guess_column(optional_columns, "description"))
+            date_format = st.text_input("Date format", value=DEFAULT_DATE_FORMAT)
+
+        if st.button("Import", disabled=not csv_columns):
+            column_map = {
+                "date": date_column,
+                "amount": amount_column,
+                "type": type_column,
+                "category": category_column,
+                "description": description_column,
+            }
+            column_map = {k: (None if v == "(none)" else v) for k, v in column_map.items()}
+            try:
+                imported, skipped = import_csv(
+                    user_id,
+                    io.TextIOWrapper(uploaded, encoding="utf-8-sig", newline=""),
+                    column_map=column_map,
+                    date_format=date_format
+                )
+            except ImportFormatError as e:
+                st.error(f"Import failed: {e}")
+            else:
+                st.session_state.tx_page_cursors = [None]
+                st.success(f"Imported {imported} transactions, skipped {skipped} duplicates!")
+                st.rerun()
+
+def previous_page():
+    st.session_state.tx_page_cursors.pop()
+
+
+def next_page(cursor):
+    st.session_state.tx_page_cursors.append(cursor)
 
 # Display transactions table
-st.subheader("📋 Transactions")
-rows = get_transactions()
-df = pd.DataFrame(
-    rows,
-    columns=["ID", "Date", "Amount", "Type", "Savings Goal", "Category", "Description"]
-)
-st.dataframe(df, use_container_width="stretch")
-
-# Delete transaction
-st.subheader("🗑 Delete Transaction")
-tx_ids = df["ID"].tolist()
-selected_id = st.selectbox("Select Transaction ID", tx_ids)
-
-if st.button("Delete"):
-    delete_transaction(selected_id)
-    st.success("Transaction deleted!")
-    st.rerun()
+@st.fragment
+def transactions_section():
+    mark_section("Transactions table")
+    category_dict = {name: cid for cid, name in page_categories()}
+    goals = page_goals()
+    savings_goal_dict = {g[1]: g[0] for g in goals}
 
-# Monthly Summary
-st.subheader("📅 Monthly Summary")
-income = df[df["Type"] == "Income"]["Amount"].sum()
-expense = df[df["Type"] == "Expense"]["Amount"].sum()
-balance = income - expense
+    st.subheader("📋 Transactions")
 
-col1, col2, col3 = st.columns(3)
-col1.metric("Total Income", f"RM {income:.2f}")
-col2.metric("Total Expense", f"RM {expense:.2f}")
-col3.metric("Balance", f"RM {balance:.2f}")
+    search_query = st.text_input("🔍 Search descriptions", key="tx_search").strip()
 
-# Add new savings goal form
-st.subheader("🎯 Add New Savings Goal")
-with st.form("add_savings_goal_form"):
-    col1, col2 = st.columns(2)
-    with col1:
-        goal_name = st.text_input("Goal Name (e.g. Emergency Fund)")
-        target_amount = st.number_input(
-            "Target Amount (RM)",
-            min_value=0.0,
-            format="%.2f"
+    # Filters are applied in SQL, so only matching rows are fetched
+    with st.expander("🔎 Filters"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            filter_dates = st.date_input("Date range", value=(), key="filter_dates")
+            filter_type = st.selectbox("Type", ["All", "Income", "Expense"], key="filter_type")
+        with col2:
+            filter_category = st.selectbox("Category", ["All"] + list(category_dict.keys()), key="filter_category")
+            filter_goal = st.selectbox("Savings Goal", ["All"] + [g[1] for g in goals], key="filter_goal")
+        with col3:
+            filter_min = st.number_input("Min Amount", min_value=0.0, value=None, format="%.2f", key="filter_min")
+            filter_max = st.number_input("Max Amount", min_value=0.0, value=None, format="%.2f", key="filter_max")
+        filter_description = st.text_input("Description contains", key="filter_description")
+
+    tx_filters = {
+        "start_date": filter_dates[0] if len(filter_dates) > 0 else None,
+        "end_date": filter_dates[1] + pd.Timedelta(days=1) if len(filter_dates) > 1 else None,
+        "tx_type": None if filter_type == "All" else filter_type,
+        "category_id": category_dict.get(filter_category),
+        "savings_goal_id": savings_goal_dict.get(filter_goal),
+        "min_amount": filter_min,
+        "max_amount": filter_max,
+        "description": filter_description.strip(),
+    }
+    # Changing the search or filters starts again from the first page
+    if st.session_state.get("tx_filters") != (search_query, tx_filters):
+        st.session_state.tx_filters = (search_query, tx_filters)
+        st.session_state.tx_page_cursors = [None]
+
+    page_cursors = st.session_state.tx_page_cursors
+    if search_query:
+        # Search results are ranked, so they are paged by offset
+        rows = load(
+            "Transactions table",
+            ("transactions",),
+            search_transactions,
+            user_id,
+            search_query,
+            TRANSACTIONS_PAGE_SIZE + 1,
+            offset=(len(page_cursors) - 1) * TRANSACTIONS_PAGE_SIZE,
+            **tx_filters
+        )
+    else:
+        rows = load(
+            "Transactions table",
+            ("transactions",),
+            get_transactions_page,
+            user_id,
+            TRANSACTIONS_PAGE_SIZE + 1,
+            after=page_cursors[-1],
+            **tx_filters
         )
+    has_next_page = len(rows) > TRANSACTIONS_PAGE_SIZE
+    rows = rows[:TRANSACTIONS_PAGE_SIZE]
+    df = pd.DataFrame(
+        rows,
+        columns=["ID", "Date", "Amount", "Type", "Savings Goal", "Category", "Description"]
+    )
+    # For the performance panel
+    st.session_state.tx_df = df
+    st.dataframe(df, use_container_width="stretch")
+
+    # Callbacks run before the fragment reruns, so the new page shows at once
+    col1, col2, col3 = st.columns([1, 2, 1])
+    col1.button("⬅️ Previous", disabled=len(page_cursors) == 1, on_click=previous_page)
+    col2.caption(f"Page {len(page_cursors)}")
+    col3.button(
+        "Next ➡️",
+        disabled=not has_next_page,
+        on_click=next_page,
+        args=((rows[-1][1], rows[-1][0]) if rows else None,)
+    )
 
-    with col2:
-        start_date = st.date_input("Start Date")
-        target_date = st.date_input("Target Date")
+    # Export transactions
+    with st.expander("📤 Export Transactions"):
+        export_format = st.radio("Format", sorted(EXPORTERS), horizontal=True)
+
+        def build_export():
+            # Runs only when the button is clicked. Streamlit keeps the whole
+            # file in its in-memory media store while serving it, so the
+            # export is built in memory too
+            out = io.BytesIO()
+            EXPORTERS[export_format](user_id, out)
+            out.seek(0)
+            return out
+
+        st.download_button(
+            "Download",
+            data=build_export,
+            file_name=f"transactions.{export_format}",
+            mime="text/csv" if export_format == "csv" else "application/octet-stream"
+        )
 
-    submitted = st.form_submit_button("Create Goal")
+    # Delete transaction
+    st.subheader("🗑 Delete Transaction")
+    tx_ids = df["ID"].tolist()
+    selected_id = st.selectbox("Select Transaction ID", tx_ids)
 
-    if submitted:
-        add_savings_goal(
-            goal_name=goal_name,
-            target_amount=target_amount,
-            start_date=start_date,
-            target_date=target_date
-        )
-        st.success("Savings goal created!")
+    if st.button("Delete"):
+        delete_transaction(user_id, selected_id)
+        st.success("Transaction deleted!")
         st.rerun()
 
-# Display savings goals and progress bar
-for goal in goals:
+# Monthly Summary
+@st.fragment
+def summary_section():
+    mark_section("Summary")
+    st.subheader("📅 Monthly Summary")
+    this_month = date.today().replace(day=1)
+    month_options = [
+        (this_month - pd.DateOffset(months=i)).date() for i in range(SUMMARY_MONTHS)
+    ]
+    summary_month = st.selectbox(
+        "Month",
+        month_options,
+        format_func=lambda d: d.strftime("%B %Y")
+    )
+    next_month = (summary_month + pd.DateOffset(months=1)).date()
+    income, expense = load("Summary", ("transactions",), get_summary, user_id, summary_month, next_month)
+    balance = income - expense
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Income", f"RM {income:.2f}")
+    col2.metric("Total Expense", f"RM {expense:.2f}")
+    col3.metric("Balance", f"RM {balance:.2f}")
+
+# Add new savings goal form
+@st.fragment
+def add_goal_section():
+    mark_section("Goals")
+    st.subheader("🎯 Add New Savings Goal")
+    with st.form("add_savings_goal_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            goal_name = st.text_input("Goal Name (e.g. Emergency Fund)")
+            target_amount = st.number_input(
+                "Target Amount (RM)",
+                min_value=0.0,
+                format="%.2f"
+            )
+
+        with col2:
+            start_date = st.date_input("Start Date")
+            target_date = st.date_input("Target Date")
+
+        submitted = st.form_submit_button("Create Goal")
+
+        if submitted:
+            add_savings_goal(
+                user_id=user_id,
+                goal_name=goal_name,
+                target_amount=target_amount,
+                start_date=start_date,
+                target_date=target_date
+            )
+            st.success("Savings goal created!")
+            st.rerun()
+
+# Display a savings goal and its progress bar
+@st.fragment
+def goal_card(goal, savings_category_id):
     goal_id, name, target, current, start, end = goal
-    saved_f = float(get_savings_total_by_goal(goal_id))
+    saved_f = float(current or 0)
     target_f = float(target)
 
     # Planned monthly savings, start -> end
     total_days = (end - start).days
     total_months = max(math.ceil(total_days / 30),1)
     planned_monthly = target_f / total_months
-    
+
     # Required monthly savings, now -> end
     today = date.today()
     remaining_amount = max(target_f - saved_f, 0)
@@ -248,11 +513,12 @@ for goal in goals:
 
             if st.form_submit_button("Add to Savings"):
                 add_transaction(
+                    user_id=user_id,
                     date=pd.Timestamp.today().date(),
                     amount=save_amount,
                     tx_type="Expense",
                     savings_goal_id=goal_id,
-                    category_id=category_dict["Savings"],
+                    category_id=savings_category_id,
                     description=note
                 )
                 st.success("Money added to savings!")
@@ -288,6 +554,7 @@ for goal in goals:
 
             if st.form_submit_button("Update Goal"):
                 update_savings_goal(
+                    user_id,
                     goal_id,
                     new_name,
                     new_target,
@@ -303,10 +570,52 @@ for goal in goals:
             if saved_f > 0:
                 st.warning("Cannot delete goal with existing savings.")
             else:
-                delete_savings_goal(goal_id)
+                delete_savings_goal(user_id, goal_id)
                 st.warning("Savings goal deleted!")
                 st.rerun()
 
 
+# Only full renders use the dashboard; fragment reruns query for themselves
+st.session_state.dashboard = load_dashboard()
+try:
+    add_transaction_section()
+    import_section()
+    transactions_section()
+    summary_section()
+    add_goal_section()
+    savings_category_id = {name: cid for cid, name in page_categories()}["Savings"]
+    for goal in page_goals():
+        goal_card(goal, savings_category_id)
+finally:
+    del st.session_state.dashboard
 
-
+# -----------------------------
+# PERFORMANCE PANEL (opt-in, sidebar)
+# -----------------------------
+mark_section(None)
+if st.session_state.get("perf_panel"):
+    query_stats = rerun_stats()
+    with perf_placeholder.container():
+        st.metric("Render time", f"{rerun_elapsed_ms():.0f} ms")
+        st.caption(
+            f"{sum(q['calls'] for q in query_stats.values())} queries · "
+            f"{sum(q['rows'] for q in query_stats.values())} rows · "
+            f"DataFrame {st.session_state.tx_df.memory_usage(deep=True).sum() / 1024:.1f} KiB"
+        )
+        st.dataframe(
+            pd.DataFrame(
+                [(name, round(ms, 1)) for name, ms in section_times().items()],
+                columns=["Section", "ms"]
+            ),
+            hide_index=True
+        )
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    (name, q["calls"], round(q["total_ms"], 1), q["rows"], round(q["acquire_ms"], 1))
+                    for name, q in sorted(query_stats.items(), key=lambda item: -item[1]["total_ms"])
+                ],
+                columns=["Query", "Calls", "ms", "Rows", "Acquire ms"]
+            ),
+            hide_index=True
+        )
@@ -0,0 +1,241 @@
+"""Benchmark the db functions and a full page render.
+
+Needs a migrated local database. For each size (years of history) a
+benchmark user is created with seed_synthetic, then every function in
+db/crud.py and db/auth.py is timed against that user, followed by a full
+app.py render through Streamlit's AppTest. Results are printed (or
+written with --output) as JSON so runs can be compared.
+
+    python -m benchmarks.run --years 1,5,20 --repeat 5 --output bench.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import date, timedelta
+
+from db import auth, crud
+from db.cache import invalidate
+from db.database import get_connection
+from db.frames import clear_frame_cache, get_transactions_frame
+from seed_synthetic import DEFAULT_PASSWORD, seed
+
+BENCH_END_DATE = date(2025, 12, 31)
+BULK_ROWS = 100
+
+
+def _summary(timings):
+    return {
+        "runs": len(timings),
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def _bench_user(years, seed_value):
+    prefix = f"bench-{years}y-"
+    email = f"{prefix}0@example.com"
+    seed(1, years, seed_value, BENCH_END_DATE, prefix)
+
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT u.id, COUNT(t.id)
+            FROM users u
+            LEFT JOIN transactions t ON t.user_id = u.id
+            WHERE u.email = %s
+            GROUP BY u.id
+            """,
+            (email,)
+        )
+        user_id, transactions = cur.fetchone()
+    return email, user_id, transactions
+
+
+def crud_cases(user_id, email):
+    """(name, func, setup, teardown) for every crud and auth function.
+
+    Writes are undone in their teardown so every run sees the same data.
+    """
+    month = BENCH_END_DATE.replace(day=1)
+    next_month = (month + timedelta(days=32)).replace(day=1)
+    category_ids = {name: cid for cid, name in crud.get_categories()}
+    category_id = category_ids["Food"]
+    goal_id = crud.get_savings_goals(user_id)[0][0]
+    first_page = crud.get_transactions_page(user_id, 50)
+    after = (first_page[-1][1], first_page[-1][0])
+    tx = first_page[0]
+    bulk_rows = [(month, 1, "Expense", category_id, f"bench bulk {i}", None) for i in range(BULK_ROWS)]
+
+    # Generated descriptions never contain "bench", so these only find our rows
+    def cleanup_transactions(_=None):
+        for row in crud.get_transactions_page(user_id, BULK_ROWS * 2, description="bench"):
+            crud.delete_transaction(user_id, row[0])
+
+    def cleanup_goals(_=None):
+        invalidate("savings_goals")
+        for goal in crud.get_savings_goals(user_id):
+            if goal[1] == "bench goal":
+                crud.delete_savings_goal(user_id, goal[0])
+
+    def new_transaction():
+        crud.add_transaction(user_id, month, 1, "Expense", category_id, "bench")
+        return crud.get_transactions_page(user_id, 1, description="bench")[0][0]
+
+    def version_before_write():
+        # A patch after one write; asking from version 0 fails once
+        # tombstones have been pruned
+        version = crud.get_data_versions(user_id).get("transactions", 0)
+        new_transaction()
+        return version
+
+    def new_goal():
+        crud.add_savings_goal(user_id, "bench goal", 100, month, next_month)
+        invalidate("savings_goals")
+        return next(g[0] for g in crud.get_savings_goals(user_id) if g[1] == "bench goal")
+
+    def new_email():
+        return f"bench-{uuid.uuid4().hex}@example.com"
+
+    def create_user(new_email):
+        auth.create_user(new_email, "x")
+        return new_email
+
+    def delete_user(new_email):
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM users WHERE email = %s", (new_email,))
+            conn.commit()
+
+    def uncached(entity):
+        # Measure the query, not the in-process cache
+        return lambda: invalidate(entity)
+
+    return [
+        ("get_categories", lambda _: crud.get_categories(), uncached("categories"), None),
+        ("get_savings_goals", lambda _: crud.get_savings_goals(user_id), uncached("savings_goals"), None),
+        ("get_transactions", lambda _: crud.get_transactions(user_id), None, None),
+        ("iter_transactions", lambda _: sum(1 for _ in crud.iter_transactions(user_id)), None, None),
+        ("get_transactions_frame_cold", lambda _: get_transactions_frame(user_id), clear_frame_cache, None),
+        ("get_transactions_frame_warm", lambda _: get_transactions_frame(user_id), None, None),
+        ("get_transactions_frame_patched", lambda _: get_transactions_frame(user_id), new_transaction, cleanup_transactions),
+        ("get_data_versions", lambda _: crud.get_data_versions(user_id), None, None),
+        ("get_transaction_changes", lambda since: crud.get_transaction_changes(
+            user_id, since
+        ), version_before_write, cleanup_transactions),
+        ("get_transactions_page", lambda _: crud.get_transactions_page(user_id, 50), None, None),
+        ("get_transactions_page_after", lambda _: crud.get_transactions_page(user_id, 50, after=after), None, None),
+        ("get_transactions_page_filtered", lambda _: crud.get_transactions_page(
+            user_id, 50, start_date=month, end_date=next_month, tx_type="Expense", category_id=category_id
+        ), None, None),
+        ("search_transactions", lambda _: crud.search_transactions(user_id, "grab", 50), None, None),
+        ("get_dashboard", lambda _: crud.get_dashboard(user_id, month, 51), None, None),
+        ("get_summary_month", lambda _: crud.get_summary(user_id, month, next_month), None, None),
+        ("get_summary_range", lambda _: crud.get_summary(user_id, month + timedelta(days=3), next_month), None, None),
+        ("get_monthly_rollups", lambda _: crud.get_monthly_rollups(user_id, date(2000, 1, 1), next_month), None, None),
+        ("get_savings_total", lambda _: crud.get_savings_total(user_id), None, None),
+        ("get_savings_total_by_goal", lambda _: crud.get_savings_total_by_goal(user_id, goal_id), None, None),
+        ("get_savings_totals_by_goal", lambda _: crud.get_savings_totals_by_goal(user_id, [goal_id]), None, None),
+        ("add_transaction", lambda _: crud.add_transaction(
+            user_id, month, 1, "Expense", category_id, "bench"
+        ), None, cleanup_transactions),
+        ("update_transaction", lambda _: crud.update_transaction(
+            user_id, tx[0], tx[1], tx[2], tx[3], category_ids[tx[5]], tx[6]
+        ), None, None),
+        ("delete_transaction", lambda tx_id: crud.delete_transaction(user_id, tx_id), new_transaction, None),
+        ("add_transactions_bulk", lambda _: crud.add_transactions_bulk(user_id, bulk_rows), None, cleanup_transactions),
+        ("add_transaction_chunks", lambda _: crud.add_transaction_chunks(
+            user_id, [bulk_rows[:BULK_ROWS // 2], bulk_rows[BULK_ROWS // 2:]]
+        ), None, cleanup_transactions),
+        ("add_savings_goal", lambda _: crud.add_savings_goal(
+            user_id, "bench goal", 100, month, next_month
+        ), None, cleanup_goals),
+        ("update_savings_goal", lambda new_id: crud.update_savings_goal(
+            user_id, new_id, "bench goal", 200, month, next_month
+        ), new_goal, cleanup_goals),
+        ("delete_savings_goal", lambda new_id: crud.delete_savings_goal(user_id, new_id), new_goal, None),
+        ("reconcile_savings_goals", lambda _: crud.reconcile_savings_goals(user_id), None, None),
+        ("rebuild_monthly_rollups", lambda _: crud.rebuild_monthly_rollups(user_id), None, None),
+        ("prune_transaction_tombstones", lambda _: crud.prune_transaction_tombstones(), None, None),
+        ("authenticate_user", lambda _: auth.authenticate_user(email, DEFAULT_PASSWORD), None, None),
+        ("create_user", create_user, new_email, delete_user),
+    ]
+
+
+def render_page(user_id, email):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file("app.py", default_timeout=120)
+    app.session_state["user_id"] = user_id
+    app.session_state["user_email"] = email
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(years_list, repeat, seed_value):
+    results = []
+    for years in years_list:
+        email, user_id, transactions = _bench_user(years, seed_value)
+        print(f"{years}y: user {user_id}, {transactions} transactions", flush=True)
+
+        cases = crud_cases(user_id, email)
+        cases.append(("render_app", lambda _: render_page(user_id, email), None, None))
+
+        for name, func, setup, teardown in cases:
+            entry = {"years": years, "transactions": transactions, "name": name}
+            try:
+                timings = []
+                for _ in range(repeat):
+                    arg = setup() if setup else None
+                    start = time.perf_counter()
+                    result = func(arg)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    if teardown:
+                        teardown(result)
+                entry.update(_summary(timings))
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+            results.append(entry)
+
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "repeat": repeat,
+            "seed": seed_value,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark db functions and the page render")
+    parser.add_argument("--years", default="1,5", help="Comma-separated history sizes, in years")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = run([int(y) for y in args.years.split(",")], args.repeat, args.seed)
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
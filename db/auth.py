@@ -1,35 +1,28 @@
 from db.database import get_connection
+from db.metrics import instrumented
 from auth.utils import hash_password, verify_password
 
+@instrumented
 def create_user(email: str, password: str):
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        INSERT INTO users (email, password_hash)
-        VALUES (%s, %s)
-        """,
-        (email, hash_password(password))
-    )
-
-    conn.commit()
-    cur.close()
-    conn.close()
-
-
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO users (email, password_hash)
+            VALUES (%s, %s)
+            """,
+            (email, hash_password(password))
+        )
+        conn.commit()
+
+
+@instrumented
 def authenticate_user(email: str, password: str):
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute(
-        "SELECT id, password_hash FROM users WHERE email = %s",
-        (email,)
-    )
-    user = cur.fetchone()
-
-    cur.close()
-    conn.close()
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT id, password_hash FROM users WHERE email = %s",
+            (email,)
+        )
+        user = cur.fetchone()
 
     if user and verify_password(password, user[1]):
         return user[0]  # user_id
@@ -0,0 +1,63 @@
+import threading
+from functools import wraps
+
+from cachetools import TTLCache
+
+_lock = threading.RLock()
+# entity name -> list of TTLCache objects holding results for that entity
+_caches = {}
+# entity name -> bumped on every invalidation, so a read that started before
+# a write cannot put its (now stale) result back into the cache
+_generations = {}
+
+
+def cached(entity, ttl, maxsize=1024):
+    """Cache a read function's results per argument tuple for `ttl` seconds.
+
+    User-scoped functions must take user_id as their first positional
+    argument so invalidate(entity, user_id) can find their entries.
+    """
+    def decorator(func):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        with _lock:
+            _caches.setdefault(entity, []).append(cache)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = args + tuple(sorted(kwargs.items()))
+            with _lock:
+                if key in cache:
+                    return cache[key]
+                generation = _generations.get(entity, 0)
+
+            value = func(*args, **kwargs)
+
+            with _lock:
+                if _generations.get(entity, 0) == generation:
+                    cache[key] = value
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate(entity, user_id=None):
+    """Drop cached results for an entity, optionally for one user only."""
+    with _lock:
+        _generations[entity] = _generations.get(entity, 0) + 1
+        for cache in _caches.get(entity, []):
+            if user_id is None:
+                cache.clear()
+                continue
+            for key in [k for k in cache.keys() if k and k[0] == user_id]:
+                cache.pop(key, None)
+
+
+def invalidate_all():
+    """Drop every cached result, for every entity and user."""
+    with _lock:
+        for entity, caches in _caches.items():
+            _generations[entity] = _generations.get(entity, 0) + 1
+            for cache in caches:
+                cache.clear()
@@ -1,27 +1,264 @@
+import io
+import json
+from datetime import date as date_type
+from decimal import Decimal
+
+from psycopg2.extras import execute_values
+
+from db.cache import cached, invalidate
 from db.database import get_connection
+from db.metrics import instrumented
 
-# Create a function to add a transaction
-def add_transaction(date, amount, tx_type, category_id, description, savings_goal_id=None):
-    conn = get_connection()
-    cur = conn.cursor()
+CATEGORIES_CACHE_TTL = 3600
+# db.listener evicts entries as soon as any process changes a user's goals,
+# so the TTL is only a backstop for processes not running the listener
+SAVINGS_GOALS_CACHE_TTL = 3600
+# Bulk inserts of at least this many rows go through COPY instead of
+# execute_values
+BULK_COPY_THRESHOLD = 5000
+TRANSACTIONS_ITER_BATCH_SIZE = 5000
+# Tombstones older than this are removed by prune_transaction_tombstones
+TOMBSTONE_RETENTION_DAYS = 30
+
+STAGING_COLUMNS = ("date", "amount", "type", "category_id", "description", "savings_goal_id")
+
+# NOTIFY channel for data_versions bumps; see db/listener.py
+DATA_CHANGES_CHANNEL = "data_changes"
+
+# Keep savings_goals.current_amount in step with the goal's contributions
+# (Expense transactions linked to it). Runs in the caller's transaction;
+# returns True when a goal was touched.
+def _apply_goal_delta(cur, user_id, savings_goal_id, tx_type, amount):
+    if savings_goal_id is None or tx_type != "Expense" or not amount:
+        return False
+
+    cur.execute(
+        """
+        UPDATE savings_goals
+        SET current_amount = COALESCE(current_amount, 0) + %s
+        WHERE id = %s AND user_id = %s
+        """,
+        (amount, savings_goal_id, user_id)
+    )
+    return True
 
+# Add a transaction's amount (or, with count=-1 and a negated amount, remove
+# it) to its month in monthly_rollups. Runs in the caller's transaction.
+def _apply_rollup_delta(cur, user_id, date, category_id, tx_type, amount, count):
+    cur.execute(
+        """
+        INSERT INTO monthly_rollups (user_id, month, category_id, type, total, count)
+        VALUES (%s, date_trunc('month', %s::date)::date, %s, %s, %s, %s)
+        ON CONFLICT (user_id, month, category_id, type) DO UPDATE
+        SET total = monthly_rollups.total + EXCLUDED.total,
+            count = monthly_rollups.count + EXCLUDED.count
+        """,
+        (user_id, date, category_id, tx_type, amount, count)
+    )
+
+# Bump the user's version counter for an entity (every user's, when user_id
+# is None) and return the user's new version. Runs in the caller's
+# transaction, so the new version becomes visible together with the change
+# it describes; the row lock also orders concurrent writers.
+# Also sends {"user_id", "entity", "version"} on DATA_CHANGES_CHANNEL, which
+# Postgres delivers to listening processes only once the transaction commits.
+def _bump_data_version(cur, user_id, entity):
+    cur.execute(
+        """
+        WITH bumped AS (
+            INSERT INTO data_versions (user_id, entity, version)
+            SELECT id, %(entity)s, 1
+            FROM users
+            WHERE %(user_id)s IS NULL OR id = %(user_id)s
+            ON CONFLICT (user_id, entity) DO UPDATE
+            SET version = data_versions.version + 1
+            RETURNING version
+        )
+        SELECT
+            MAX(version),
+            pg_notify(%(channel)s, json_build_object(
+                'user_id', %(user_id)s::int,
+                'entity', %(entity)s::text,
+                'version', MAX(version)
+            )::text)
+        FROM bumped
+        """,
+        {"user_id": user_id, "entity": entity, "channel": DATA_CHANGES_CHANNEL}
+    )
+    return cur.fetchone()[0]
+
+# Create a function to add a transaction
+@instrumented
+def add_transaction(user_id, date, amount, tx_type, category_id, description, savings_goal_id=None):
     query = """
-    INSERT INTO transactions (date, amount, type, savings_goal_id, category_id, description)
-    VALUES (%s, %s, %s, %s, %s, %s)
+    INSERT INTO transactions (user_id, date, amount, type, savings_goal_id, category_id, description, row_version)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
     """
-    
-    cur.execute(query, (date, amount, tx_type, savings_goal_id, category_id, description))
-    conn.commit()
-    
-    cur.close()
-    conn.close()
 
-# Read all transactions
-def get_transactions():
-    conn = get_connection()
-    cur = conn.cursor()
+    with get_connection() as conn, conn.cursor() as cur:
+        version = _bump_data_version(cur, user_id, "transactions")
+        cur.execute(query, (user_id, date, amount, tx_type, savings_goal_id, category_id, description, version))
+        _apply_rollup_delta(cur, user_id, date, category_id, tx_type, amount, 1)
+        goal_changed = _apply_goal_delta(cur, user_id, savings_goal_id, tx_type, amount)
+        if goal_changed:
+            _bump_data_version(cur, user_id, "savings_goals")
+        conn.commit()
 
-    query = """
+    if goal_changed:
+        invalidate("savings_goals", user_id)
+
+## Bulk loading
+# Rows are staged in a temporary table, then moved into transactions (with
+# the goal and rollup deltas) by one set-based statement.
+
+def _create_staging_table(cur):
+    cur.execute(
+        """
+        CREATE TEMP TABLE transaction_staging (
+            seq BIGSERIAL,
+            date DATE NOT NULL,
+            amount NUMERIC(10, 2) NOT NULL,
+            type VARCHAR(10) NOT NULL,
+            category_id INT NOT NULL,
+            description TEXT,
+            savings_goal_id INT
+        ) ON COMMIT DROP
+        """
+    )
+
+def _copy_field(value):
+    # COPY text format: \N is NULL, and backslash/tab/newlines are escaped
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+# COPY rows of STAGING_COLUMNS values into the staging table
+def _copy_into_staging(cur, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_field(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    cur.copy_expert(
+        f"COPY transaction_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN",
+        buffer
+    )
+
+# Move everything staged into transactions for user_id, updating goal
+# amounts and monthly rollups in the same statement. Returns the new ids,
+# or only how many there were when return_ids is False.
+# With skip_duplicates, staged rows whose fingerprint the user already has
+# are left out. New rows are stamped with `version` (see get_transaction_changes).
+def _merge_staged_transactions(cur, user_id, version, return_ids=True, skip_duplicates=False):
+    result = "SELECT id FROM inserted ORDER BY id" if return_ids else "SELECT COUNT(*) FROM inserted"
+    duplicate_filter = """
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM transactions t
+                WHERE t.user_id = %(user_id)s
+                AND t.fingerprint = transaction_fingerprint(s.date, s.amount, s.type, s.description)
+            )
+    """ if skip_duplicates else ""
+
+    cur.execute(
+        """
+        WITH inserted AS (
+            INSERT INTO transactions (user_id, date, amount, type, savings_goal_id, category_id, description, row_version)
+            SELECT %(user_id)s, s.date, s.amount, s.type, s.savings_goal_id, s.category_id, s.description, %(version)s
+            FROM transaction_staging s
+            """ + duplicate_filter + """
+            ORDER BY s.seq
+            RETURNING id, date, amount, type, savings_goal_id, category_id
+        ),
+        goal_totals AS (
+            UPDATE savings_goals g
+            SET current_amount = COALESCE(g.current_amount, 0) + s.total
+            FROM (
+                SELECT savings_goal_id, SUM(amount) AS total
+                FROM inserted
+                WHERE type = 'Expense'
+                AND savings_goal_id IS NOT NULL
+                GROUP BY savings_goal_id
+            ) s
+            WHERE g.id = s.savings_goal_id
+            AND g.user_id = %(user_id)s
+        ),
+        rollups AS (
+            INSERT INTO monthly_rollups (user_id, month, category_id, type, total, count)
+            SELECT %(user_id)s, date_trunc('month', date)::date, category_id, type, SUM(amount), COUNT(*)
+            FROM inserted
+            GROUP BY 2, 3, 4
+            ON CONFLICT (user_id, month, category_id, type) DO UPDATE
+            SET total = monthly_rollups.total + EXCLUDED.total,
+                count = monthly_rollups.count + EXCLUDED.count
+        )
+        """ + result,
+        {"user_id": user_id, "version": version}
+    )
+    if not return_ids:
+        return cur.fetchone()[0]
+    return [row[0] for row in cur.fetchall()]
+
+# Insert transactions that arrive in chunks (lists of rows, shaped as for
+# add_transactions_bulk) in one database transaction. Each chunk is staged
+# as it comes, through COPY when it has at least BULK_COPY_THRESHOLD rows
+# (or always, with use_copy=True), and everything is merged at the end, so
+# only one chunk is held in memory at a time.
+# Returns (ids in input order, or just their count when return_ids is
+# False, and the number of rows staged); skip_duplicates leaves out rows
+# that match an existing transaction's fingerprint.
+@instrumented
+def add_transaction_chunks(user_id, chunks, skip_duplicates=False, return_ids=True, use_copy=None):
+    staged = 0
+    with get_connection() as conn, conn.cursor() as cur:
+        _create_staging_table(cur)
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if use_copy or (use_copy is None and len(chunk) >= BULK_COPY_THRESHOLD):
+                _copy_into_staging(cur, chunk)
+            else:
+                execute_values(
+                    cur,
+                    f"INSERT INTO transaction_staging ({', '.join(STAGING_COLUMNS)}) VALUES %s",
+                    chunk,
+                    page_size=1000
+                )
+            staged += len(chunk)
+        if not staged:
+            return ([] if return_ids else 0), 0
+
+        version = _bump_data_version(cur, user_id, "transactions")
+        inserted = _merge_staged_transactions(
+            cur, user_id, version, return_ids=return_ids, skip_duplicates=skip_duplicates
+        )
+        _bump_data_version(cur, user_id, "savings_goals")
+        conn.commit()
+
+    invalidate("savings_goals", user_id)
+    return inserted, staged
+
+# Insert many transactions in one database transaction.
+# rows are (date, amount, tx_type, category_id, description, savings_goal_id);
+# returns the new ids in input order. skip_duplicates leaves out rows that
+# match an existing transaction's fingerprint.
+@instrumented
+def add_transactions_bulk(user_id, rows, skip_duplicates=False):
+    rows = list(rows)
+    if not rows:
+        return []
+
+    ids, _ = add_transaction_chunks(user_id, [rows], skip_duplicates=skip_duplicates)
+    return ids
+
+TRANSACTION_SELECT = """
     SELECT
     t.id,
     t.date,
@@ -32,76 +269,335 @@ def get_transactions():
     t.description
     FROM transactions t
     JOIN categories c ON t.category_id = c.id
-    ORDER BY t.date DESC
+"""
+
+# Keyword filters accepted by the transaction listings, as SQL conditions
+TRANSACTION_FILTERS = {
+    "start_date": "t.date >= %s",
+    "end_date": "t.date < %s",
+    "tx_type": "t.type = %s",
+    "category_id": "t.category_id = %s",
+    "savings_goal_id": "t.savings_goal_id = %s",
+    "min_amount": "t.amount >= %s",
+    "max_amount": "t.amount <= %s",
+    "description": "t.description ILIKE %s ESCAPE '\\'",
+}
+
+# Case-insensitive "contains" pattern, with LIKE wildcards in the text escaped
+def _contains_pattern(text):
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+# WHERE clause and params for one user's transactions; filters set to None
+# (or, for description, empty) are ignored
+def _transaction_filters(user_id, filters):
+    conditions = ["t.user_id = %s"]
+    params = [user_id]
+    for name, value in filters.items():
+        if name not in TRANSACTION_FILTERS:
+            raise TypeError(f"Unknown transaction filter: {name}")
+        if value is None or value == "":
+            continue
+        if name == "description":
+            value = _contains_pattern(value)
+        conditions.append(TRANSACTION_FILTERS[name])
+        params.append(value)
+    return "WHERE " + " AND ".join(conditions), params
+
+# Full listing query and params for the given filters, newest first unless
+# newest_first is False. select replaces TRANSACTION_SELECT for callers that
+# want other columns; it must alias transactions as t.
+def transactions_query(user_id, filters, select=TRANSACTION_SELECT, newest_first=True):
+    where, params = _transaction_filters(user_id, filters)
+    order = "t.date DESC, t.id DESC" if newest_first else "t.date, t.id"
+    query = f"""
+    {select}
+    {where}
+    ORDER BY {order}
     """
+    return query, params
 
-    cur.execute(query)
-    rows = cur.fetchall()
-    
-    cur.close()
-    conn.close()
+# Read all transactions
+@instrumented
+def get_transactions(user_id):
+    query, params = transactions_query(user_id, {})
 
-    return rows
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
 
-# Update a transaction
-def update_transaction(tx_id, date, amount, tx_type, category_id, description):
-    conn = get_connection()
-    cur = conn.cursor()
+# Stream transactions through a server-side cursor, batch_size rows per
+# round trip, so memory stays bounded however long the history is.
+# Accepts the keyword filters in TRANSACTION_FILTERS; select and
+# newest_first are passed to transactions_query.
+@instrumented
+def iter_transactions(user_id, batch_size=TRANSACTIONS_ITER_BATCH_SIZE, select=TRANSACTION_SELECT,
+                      newest_first=True, **filters):
+    query, params = transactions_query(user_id, filters, select=select, newest_first=newest_first)
+
+    with get_connection() as conn:
+        cur = conn.cursor(name="iter_transactions")
+        cur.itersize = batch_size
+        try:
+            cur.execute(query, params)
+            yield from cur
+        finally:
+            cur.close()
+
+# Read one page of transactions, newest first.
+# `after` is the (date, id) of the last row on the previous page; seeking
+# past it keeps every page as cheap as the first one.
+# Accepts the keyword filters in TRANSACTION_FILTERS.
+@instrumented
+def get_transactions_page(user_id, limit, after=None, **filters):
+    where, params = _transaction_filters(user_id, filters)
+    if after is not None:
+        where += " AND (t.date, t.id) < (%s, %s)"
+        params.extend(after)
+
+    query = f"""
+    {TRANSACTION_SELECT}
+    {where}
+    ORDER BY t.date DESC, t.id DESC
+    LIMIT %s
+    """
+    params.append(limit)
+
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+class TransactionChangesExpired(Exception):
+    pass
+
+# Transactions inserted, updated or deleted after since_version (a
+# "transactions" version from get_data_versions or an earlier call).
+# Returns (version, changed_rows, deleted_ids): changed rows are shaped like
+# get_transactions' and are up to date as of the returned version.
+# Raises TransactionChangesExpired when tombstones after since_version have
+# been pruned; the caller has to reload everything instead.
+@instrumented
+def get_transaction_changes(user_id, since_version):
+    where, params = _transaction_filters(user_id, {})
+
+    with get_connection() as conn, conn.cursor() as cur:
+        # One snapshot for every read, so the version matches the rows
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cur.execute(
+            """
+            SELECT
+                (SELECT version FROM data_versions WHERE user_id = %(user_id)s AND entity = 'transactions'),
+                (SELECT version FROM transaction_tombstone_horizons WHERE user_id = %(user_id)s)
+            """,
+            {"user_id": user_id}
+        )
+        version, horizon = cur.fetchone()
+        version = version or 0
+        if horizon is not None and since_version < horizon:
+            raise TransactionChangesExpired(
+                f"Deletions up to version {horizon} have been pruned"
+            )
 
+        cur.execute(
+            f"""
+            {TRANSACTION_SELECT}
+            {where} AND t.row_version > %s
+            ORDER BY t.date DESC, t.id DESC
+            """,
+            params + [since_version]
+        )
+        changed = cur.fetchall()
+
+        cur.execute(
+            """
+            SELECT transaction_id
+            FROM transaction_tombstones
+            WHERE user_id = %s AND version > %s
+            """,
+            (user_id, since_version)
+        )
+        deleted = [r[0] for r in cur.fetchall()]
+        conn.commit()
+
+    return version, changed, deleted
+
+# Ranked search over descriptions: substring matches plus fuzzy word
+# matches (pg_trgm), best first. Paginated with limit/offset since the
+# order is by score; accepts the keyword filters in TRANSACTION_FILTERS.
+@instrumented
+def search_transactions(user_id, query, limit=50, offset=0, **filters):
+    where, params = _transaction_filters(user_id, filters)
+    sql = f"""
+    {TRANSACTION_SELECT}
+    {where}
+    AND (t.description ILIKE %s ESCAPE '\\' OR %s <%% t.description)
+    ORDER BY word_similarity(%s, t.description) DESC, t.date DESC, t.id DESC
+    LIMIT %s OFFSET %s
+    """
+    params.extend([_contains_pattern(query), query, query, limit, offset])
+
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+# The user's current version per entity, e.g. {"transactions": 12}.
+# Entities never written are missing; treat them as version 0.
+@instrumented
+def get_data_versions(user_id):
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT entity, version FROM data_versions WHERE user_id = %s",
+            (user_id,)
+        )
+        return dict(cur.fetchall())
+
+# Per-month totals by category and type for start <= month < end,
+# read from monthly_rollups: (month, category, type, total, count)
+@instrumented
+def get_monthly_rollups(user_id, start, end):
     query = """
-    UPDATE transactions
-    set date = %s, amount = %s, type = %s, category_id = %s, description = %s
-    WHERE id = %s
+        SELECT r.month, c.name, r.type, r.total, r.count
+        FROM monthly_rollups r
+        JOIN categories c ON r.category_id = c.id
+        WHERE r.user_id = %s
+        AND r.month >= %s
+        AND r.month < %s
+        AND r.count > 0
+        ORDER BY r.month, c.name, r.type
     """
-    
-    cur.execute(query, (date, amount, tx_type, category_id, description, tx_id))
-    conn.commit()
-    
-    cur.close()
-    conn.close()
+
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(query, (user_id, start, end))
+        return cur.fetchall()
+
+# Income and expense totals for start <= date < end, summed in SQL.
+# Whole-month ranges are answered from monthly_rollups.
+@instrumented
+def get_summary(user_id, start, end):
+    if start.day == 1 and end.day == 1:
+        query = """
+            SELECT
+                COALESCE(SUM(total) FILTER (WHERE type = 'Income'), 0),
+                COALESCE(SUM(total) FILTER (WHERE type = 'Expense'), 0)
+            FROM monthly_rollups
+            WHERE user_id = %s
+            AND month >= %s
+            AND month < %s
+        """
+
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(query, (user_id, start, end))
+            return cur.fetchone()
+
+    query = """
+        SELECT
+            COALESCE(SUM(amount) FILTER (WHERE type = 'Income'), 0),
+            COALESCE(SUM(amount) FILTER (WHERE type = 'Expense'), 0)
+        FROM transactions
+        WHERE user_id = %s
+        AND date >= %s
+        AND date < %s
+    """
+
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(query, (user_id, start, end))
+        return cur.fetchone()
+
+# Update a transaction
+@instrumented
+def update_transaction(user_id, tx_id, date, amount, tx_type, category_id, description):
+    # The subquery locks the row and hands back its values from before the update
+    query = """
+    UPDATE transactions t
+    set date = %s, amount = %s, type = %s, category_id = %s, description = %s, row_version = %s
+    FROM (
+        SELECT id, date, amount, type, category_id
+        FROM transactions
+        WHERE id = %s AND user_id = %s
+        FOR UPDATE
+    ) old
+    WHERE t.id = old.id
+    RETURNING t.savings_goal_id, old.date, old.amount, old.type, old.category_id
+    """
+
+    with get_connection() as conn, conn.cursor() as cur:
+        version = _bump_data_version(cur, user_id, "transactions")
+        cur.execute(query, (date, amount, tx_type, category_id, description, version, tx_id, user_id))
+        row = cur.fetchone()
+        goal_changed = False
+        if row is not None:
+            savings_goal_id, old_date, old_amount, old_type, old_category_id = row
+            _apply_rollup_delta(cur, user_id, old_date, old_category_id, old_type, -old_amount, -1)
+            _apply_rollup_delta(cur, user_id, date, category_id, tx_type, amount, 1)
+            goal_changed = _apply_goal_delta(cur, user_id, savings_goal_id, old_type, -old_amount)
+            goal_changed = _apply_goal_delta(cur, user_id, savings_goal_id, tx_type, amount) or goal_changed
+            if goal_changed:
+                _bump_data_version(cur, user_id, "savings_goals")
+        conn.commit()
+
+    if goal_changed:
+        invalidate("savings_goals", user_id)
 
 # Delete a transaction
-def delete_transaction(tx_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM transactions WHERE id = %s", (tx_id,))
-    conn.commit()
-    cur.close()
-    conn.close()
+@instrumented
+def delete_transaction(user_id, tx_id):
+    with get_connection() as conn, conn.cursor() as cur:
+        version = _bump_data_version(cur, user_id, "transactions")
+        cur.execute(
+            """
+            DELETE FROM transactions
+            WHERE id = %s AND user_id = %s
+            RETURNING savings_goal_id, date, category_id, type, amount
+            """,
+            (tx_id, user_id)
+        )
+        row = cur.fetchone()
+        goal_changed = False
+        if row is not None:
+            savings_goal_id, date, category_id, tx_type, amount = row
+            _apply_rollup_delta(cur, user_id, date, category_id, tx_type, -amount, -1)
+            goal_changed = _apply_goal_delta(cur, user_id, savings_goal_id, tx_type, -amount)
+            cur.execute(
+                "INSERT INTO transaction_tombstones (user_id, version, transaction_id) VALUES (%s, %s, %s)",
+                (user_id, version, tx_id)
+            )
+            if goal_changed:
+                _bump_data_version(cur, user_id, "savings_goals")
+        conn.commit()
+
+    if goal_changed:
+        invalidate("savings_goals", user_id)
 
 # Categories helper functions
+# Categories are shared by every user, so they take no user_id
+@cached("categories", ttl=CATEGORIES_CACHE_TTL)
+@instrumented
 def get_categories():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name FROM categories ORDER BY name")
-    categories = cur.fetchall()
-    cur.close()
-    conn.close()
-    return categories
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT id, name FROM categories ORDER BY name")
+        return cur.fetchall()
 
 
 ## CRUD for savings goals
 
 # Add savings goals
-def add_savings_goal(goal_name, target_amount, start_date, target_date):
-    conn = get_connection()
-    cur = conn.cursor()
-
+@instrumented
+def add_savings_goal(user_id, goal_name, target_amount, start_date, target_date):
     query = """
-    INSERT INTO savings_goals (goal_name, target_amount, start_date, target_date)
-    VALUES (%s, %s, %s, %s)
+    INSERT INTO savings_goals (user_id, goal_name, target_amount, start_date, target_date)
+    VALUES (%s, %s, %s, %s, %s)
     """
-    cur.execute(query, (goal_name, target_amount, start_date, target_date))
-    conn.commit()
-    
-    cur.close()
-    conn.close()
 
-# Get savings goal
-def get_savings_goals():
-    conn = get_connection()
-    cur = conn.cursor()
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(query, (user_id, goal_name, target_amount, start_date, target_date))
+        _bump_data_version(cur, user_id, "savings_goals")
+        conn.commit()
+    invalidate("savings_goals", user_id)
 
+# Get savings goal
+@cached("savings_goals", ttl=SAVINGS_GOALS_CACHE_TTL)
+@instrumented
+def get_savings_goals(user_id):
     query = """
         SELECT
             id,
@@ -111,81 +607,280 @@ def get_savings_goals():
             start_date,
             target_date
         FROM savings_goals
+        WHERE user_id = %s
         ORDER BY created_at DESC
     """
-    cur.execute(query)
-    rows = cur.fetchall()
 
-    cur.close()
-    conn.close()
-    return rows
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(query, (user_id,))
+        return cur.fetchall()
 
 # Update savings goal
-def update_savings_goal(goal_id, goal_name, target_amount, start_date, target_date):
-    conn = get_connection()
-    cur = conn.cursor()
-
+@instrumented
+def update_savings_goal(user_id, goal_id, goal_name, target_amount, start_date, target_date):
     query = """
         UPDATE savings_goals
         SET goal_name = %s,
             target_amount = %s,
             start_date = %s,
             target_date = %s
-        WHERE id = %s
+        WHERE id = %s AND user_id = %s
     """
-    cur.execute(
-        query,
-        (goal_name, target_amount, start_date, target_date, goal_id)
-    )
 
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            query,
+            (goal_name, target_amount, start_date, target_date, goal_id, user_id)
+        )
+        _bump_data_version(cur, user_id, "savings_goals")
+        conn.commit()
+    invalidate("savings_goals", user_id)
 
 # Delete savings goal
-def delete_savings_goal(goal_id):
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("DELETE FROM savings_goals WHERE id = %s", (goal_id,))
-
-    conn.commit()
-    cur.close()
-    conn.close()
-
-def get_savings_total():
-    conn = get_connection()
-    cur = conn.cursor()
+@instrumented
+def delete_savings_goal(user_id, goal_id):
+    with get_connection() as conn, conn.cursor() as cur:
+        # The foreign key would clear savings_goal_id too (ON DELETE SET
+        # NULL), but doing it here stamps the rows as changed
+        version = _bump_data_version(cur, user_id, "transactions")
+        cur.execute(
+            """
+            UPDATE transactions
+            SET savings_goal_id = NULL, row_version = %s
+            WHERE user_id = %s AND savings_goal_id = %s
+            """,
+            (version, user_id, goal_id)
+        )
+        cur.execute(
+            "DELETE FROM savings_goals WHERE id = %s AND user_id = %s",
+            (goal_id, user_id)
+        )
+        _bump_data_version(cur, user_id, "savings_goals")
+        conn.commit()
+    invalidate("savings_goals", user_id)
 
+@instrumented
+def get_savings_total(user_id):
     query = """
         SELECT COALESCE(SUM(amount), 0)
         FROM transactions t
         JOIN categories c ON t.category_id = c.id
-        WHERE c.name = 'Savings'
+        WHERE t.user_id = %s
+        AND c.name = 'Savings'
         AND t.type = 'Expense'
     """
-    cur.execute(query)
-    total = cur.fetchone()[0]
-
-    cur.close()
-    conn.close()
-    return total
 
-def get_savings_total_by_goal(goal_id):
-    conn = get_connection()
-    cur = conn.cursor()
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(query, (user_id,))
+        return cur.fetchone()[0]
 
+@instrumented
+def get_savings_total_by_goal(user_id, goal_id):
     query = """
         SELECT COALESCE(SUM(amount), 0)
         FROM transactions
         WHERE savings_goal_id = %s
+        AND user_id = %s
+        AND type = 'Expense'
+    """
+
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(query, (goal_id, user_id))
+        return cur.fetchone()[0]
+
+# Totals for several goals in one query, as {goal_id: total}
+@instrumented
+def get_savings_totals_by_goal(user_id, goal_ids):
+    totals = {goal_id: 0 for goal_id in goal_ids}
+    if not totals:
+        return totals
+
+    query = """
+        SELECT savings_goal_id, SUM(amount)
+        FROM transactions
+        WHERE savings_goal_id = ANY(%s)
+        AND user_id = %s
         AND type = 'Expense'
+        GROUP BY savings_goal_id
     """
-    cur.execute(query, (goal_id,))
-    total = cur.fetchone()[0]
 
-    cur.close()
-    conn.close()
-    return total
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(query, (list(totals), user_id))
+        totals.update(cur.fetchall())
+    return totals
+
+# Rebuild current_amount from the transactions table, for one user or all.
+# Returns the number of goals rewritten.
+@instrumented
+def reconcile_savings_goals(user_id=None):
+    query = """
+        UPDATE savings_goals g
+        SET current_amount = COALESCE((
+            SELECT SUM(t.amount)
+            FROM transactions t
+            WHERE t.savings_goal_id = g.id
+            AND t.type = 'Expense'
+        ), 0)
+        WHERE %(user_id)s IS NULL OR g.user_id = %(user_id)s
+    """
+
+    with get_connection() as conn, conn.cursor() as cur:
+        # Wait for in-flight transaction writes, which take this lock first,
+        # so the sums below see their contributions instead of overwriting them
+        _bump_data_version(cur, user_id, "transactions")
+        cur.execute(query, {"user_id": user_id})
+        count = cur.rowcount
+        _bump_data_version(cur, user_id, "savings_goals")
+        conn.commit()
+
+    invalidate("savings_goals", user_id)
+    return count
+
+# Delete tombstones older than `days`, raising each affected user's horizon
+# in transaction_tombstone_horizons to the newest version pruned.
+# Returns the number of tombstones deleted.
+@instrumented
+def prune_transaction_tombstones(days=TOMBSTONE_RETENTION_DAYS):
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH pruned AS (
+                DELETE FROM transaction_tombstones
+                WHERE deleted_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+                RETURNING user_id, version
+            ),
+            horizons AS (
+                INSERT INTO transaction_tombstone_horizons AS h (user_id, version)
+                SELECT user_id, MAX(version)
+                FROM pruned
+                GROUP BY user_id
+                ON CONFLICT (user_id) DO UPDATE
+                SET version = GREATEST(h.version, EXCLUDED.version)
+            )
+            SELECT COUNT(*) FROM pruned
+            """,
+            (days,)
+        )
+        count = cur.fetchone()[0]
+        conn.commit()
+
+    return count
+
+# Recompute monthly_rollups from the transactions table, for one user or all.
+# Returns the number of rollup rows written.
+# Writes are held off for the whole rebuild: a delta committed between the
+# DELETE and the INSERT would otherwise be counted twice or collide with a
+# rebuilt row.
+@instrumented
+def rebuild_monthly_rollups(user_id=None):
+    params = {"user_id": user_id}
+
+    with get_connection() as conn, conn.cursor() as cur:
+        # Summaries are read from the rollups. Bumping first takes the same
+        # row locks transaction writes start with, so the rebuild queues
+        # behind them instead of deadlocking on monthly_rollups.
+        _bump_data_version(cur, user_id, "transactions")
+        if user_id is None:
+            # Users created after the bump have no version row locked yet
+            cur.execute("LOCK TABLE monthly_rollups IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(
+            "DELETE FROM monthly_rollups WHERE %(user_id)s IS NULL OR user_id = %(user_id)s",
+            params
+        )
+        cur.execute(
+            """
+            INSERT INTO monthly_rollups (user_id, month, category_id, type, total, count)
+            SELECT user_id, date_trunc('month', date)::date, category_id, type, SUM(amount), COUNT(*)
+            FROM transactions
+            WHERE user_id IS NOT NULL
+            AND (%(user_id)s IS NULL OR user_id = %(user_id)s)
+            GROUP BY 1, 2, 3, 4
+            """,
+            params
+        )
+        count = cur.rowcount
+        conn.commit()
+
+    return count
+
+## Dashboard
+# Everything the main page shows on a full render, in one round trip.
+
+DASHBOARD_QUERY = """
+    SELECT json_build_object(
+        'versions', (
+            SELECT COALESCE(json_object_agg(entity, version), '{}')
+            FROM data_versions
+            WHERE user_id = %(user_id)s
+        ),
+        'categories', (
+            SELECT COALESCE(json_agg(json_build_array(id, name) ORDER BY name), '[]')
+            FROM categories
+        ),
+        'goals', (
+            SELECT COALESCE(json_agg(
+                json_build_array(id, goal_name, target_amount, current_amount, start_date, target_date)
+                ORDER BY created_at DESC
+            ), '[]')
+            FROM savings_goals
+            WHERE user_id = %(user_id)s
+        ),
+        'summary', (
+            SELECT json_build_array(
+                COALESCE(SUM(total) FILTER (WHERE type = 'Income'), 0),
+                COALESCE(SUM(total) FILTER (WHERE type = 'Expense'), 0)
+            )
+            FROM monthly_rollups
+            WHERE user_id = %(user_id)s
+            AND month = %(month)s
+        ),
+        'transactions', (
+            SELECT COALESCE(json_agg(
+                json_build_array(id, date, amount, type, savings_goal_id, category, description)
+                ORDER BY date DESC, id DESC
+            ), '[]')
+            FROM (
+                """ + TRANSACTION_SELECT + """
+                WHERE t.user_id = %(user_id)s
+                ORDER BY t.date DESC, t.id DESC
+                LIMIT %(limit)s
+            ) page
+        )
+    )::text
+"""
 
+# The page's data as one JSON document, built by a single SELECT:
+#   versions      get_data_versions(user_id)
+#   categories    get_categories()
+#   goals         get_savings_goals(user_id), current_amount being each
+#                 goal's saved total
+#   summary       get_summary(user_id, month, <next month>)
+#   transactions  get_transactions_page(user_id, limit)
+# Values are converted back to the types those functions return, so the
+# parts can stand in for their results. month must be a first of month.
+@instrumented
+def get_dashboard(user_id, month, limit):
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(DASHBOARD_QUERY, {"user_id": user_id, "month": month, "limit": limit})
+        data = json.loads(cur.fetchone()[0], parse_float=Decimal)
 
+    return {
+        "versions": data["versions"],
+        "categories": [tuple(c) for c in data["categories"]],
+        "goals": [
+            (
+                goal_id,
+                name,
+                float(target),
+                None if current is None else Decimal(current),
+                date_type.fromisoformat(start),
+                date_type.fromisoformat(end),
+            )
+            for goal_id, name, target, current, start, end in data["goals"]
+        ],
+        "summary": tuple(Decimal(total) for total in data["summary"]),
+        "transactions": [
+            (tx_id, date_type.fromisoformat(day), Decimal(amount), tx_type, goal_id, category, description)
+            for tx_id, day, amount, tx_type, goal_id, category, description in data["transactions"]
+        ],
+    }
@@ -1,9 +1,139 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import pool
+
+from db.metrics import InstrumentedCursor, note_acquire
+
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "database": os.environ.get("DB_NAME", "akmal"),
+    "user": os.environ.get("DB_USER", "akmal"),
+    "password": os.environ.get("DB_PASSWORD", "1234"),
+}
+
+POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN", 1))
+POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX", 10))
+# Seconds to wait for a free connection before giving up
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+# Connections idle longer than this are pinged before being handed out
+POOL_IDLE_CHECK = float(os.environ.get("DB_POOL_IDLE_CHECK", 30))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool with a checkout timeout and health check."""
+
+    def __init__(self, minconn, maxconn, timeout, idle_check, **kwargs):
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **kwargs)
+        # ThreadedConnectionPool raises immediately when exhausted, so the
+        # semaphore is what makes callers wait for a free slot instead.
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._maxconn = maxconn
+        self._timeout = timeout
+        self._idle_check = idle_check
+        self._last_used = {}
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self._timeout):
+            raise PoolTimeout(
+                f"No database connection available after {self._timeout}s"
+            )
+        try:
+            conn = self._pool.getconn()
+            # After a database restart every idle connection is dead. The
+            # pool holds at most maxconn of them, so once those are
+            # discarded getconn has to open a new one.
+            for _ in range(self._maxconn):
+                if self._is_healthy(conn):
+                    break
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close=False):
+        try:
+            if not close and not conn.closed:
+                # Never hand out a connection with a half-finished transaction
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        close = True
+            close = close or bool(conn.closed)
+            if close:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self._idle_check:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    # Created once per process and shared by every Streamlit session thread
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    POOL_MIN_SIZE,
+                    POOL_MAX_SIZE,
+                    POOL_TIMEOUT,
+                    POOL_IDLE_CHECK,
+                    cursor_factory=InstrumentedCursor,
+                    **DB_CONFIG,
+                )
+    return _pool
+
 
+@contextmanager
 def get_connection():
-    return psycopg2.connect(
-        host = "localhost",
-        database = "akmal",
-        user = "akmal",
-        password = "1234"
-    )
\ No newline at end of file
+    """Borrow a pooled connection; rolls back on error and always returns it."""
+    db_pool = get_pool()
+    start = time.perf_counter()
+    conn = db_pool.getconn()
+    note_acquire((time.perf_counter() - start) * 1000)
+    broken = False
+    try:
+        yield conn
+    except Exception:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        raise
+    finally:
+        db_pool.putconn(conn, close=broken)
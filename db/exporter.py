@@ -0,0 +1,97 @@
+import argparse
+from itertools import islice
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from db.crud import iter_transactions, transactions_query
+from db.database import get_connection
+
+EXPORT_BATCH_SIZE = 10000
+
+# Exports name the savings goal rather than its id, and run oldest first
+EXPORT_SELECT = """
+    SELECT
+        t.id,
+        t.date,
+        t.amount,
+        t.type,
+        c.name AS category,
+        g.goal_name AS savings_goal,
+        t.description
+    FROM transactions t
+    JOIN categories c ON t.category_id = c.id
+    LEFT JOIN savings_goals g ON t.savings_goal_id = g.id
+"""
+
+PARQUET_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("date", pa.date32()),
+    ("amount", pa.decimal128(10, 2)),
+    ("type", pa.string()),
+    ("category", pa.string()),
+    ("savings_goal", pa.string()),
+    ("description", pa.string()),
+])
+
+
+def export_transactions_csv(user_id, out):
+    """Write the user's transactions as CSV to a binary file object.
+
+    Uses COPY ... TO STDOUT, so rows are streamed from the server into
+    `out` without being collected in Python.
+    """
+    query, params = transactions_query(user_id, {}, select=EXPORT_SELECT, newest_first=False)
+
+    with get_connection() as conn, conn.cursor() as cur:
+        query = cur.mogrify(query, params).decode()
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
+        conn.commit()
+
+
+def export_transactions_parquet(user_id, out, batch_size=EXPORT_BATCH_SIZE):
+    """Write the user's transactions as Parquet to a path or binary file.
+
+    Rows come from iter_transactions' server-side cursor and are written
+    one row group per batch, so memory is bounded by batch_size.
+    """
+    rows = iter_transactions(user_id, batch_size=batch_size, select=EXPORT_SELECT, newest_first=False)
+
+    try:
+        with pq.ParquetWriter(out, PARQUET_SCHEMA) as writer:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                columns = list(zip(*batch))
+                writer.write_batch(
+                    pa.RecordBatch.from_arrays(
+                        [pa.array(col, type=field.type) for col, field in zip(columns, PARQUET_SCHEMA)],
+                        schema=PARQUET_SCHEMA
+                    )
+                )
+    finally:
+        # Hands the connection back even if writing fails part-way
+        rows.close()
+
+
+EXPORTERS = {
+    "csv": export_transactions_csv,
+    "parquet": export_transactions_parquet,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a user's transactions")
+    parser.add_argument("path", help="File to write")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--format", choices=sorted(EXPORTERS), default="csv")
+    args = parser.parse_args()
+
+    with open(args.path, "wb") as f:
+        EXPORTERS[args.format](args.user_id, f)
+    print(f"Exported transactions to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+import threading
+
+import pandas as pd
+from cachetools import LRUCache
+
+from db.crud import (
+    TransactionChangesExpired,
+    get_data_versions,
+    get_transaction_changes,
+    iter_transactions,
+)
+from db.metrics import instrumented
+
+# Memory budget for cached transaction frames, shared by every session in
+# the process. Least recently used users are evicted first.
+FRAME_CACHE_MAX_BYTES = int(os.environ.get("FRAME_CACHE_MAX_MB", 256)) * 1024 * 1024
+
+FRAME_COLUMNS = ["id", "date", "amount", "type", "savings_goal_id", "category", "description"]
+# Categoricals and narrow ints keep a ledger of repeated merchants,
+# categories and types a fraction of the size of plain object columns
+FRAME_DTYPES = {
+    "id": "int32",
+    "date": "datetime64[ns]",
+    "amount": "float64",
+    "type": "category",
+    "savings_goal_id": "Int32",
+    "category": "category",
+    "description": "category",
+}
+
+_lock = threading.Lock()
+# user_id -> (transactions version, frame, size in bytes)
+_frames = LRUCache(maxsize=FRAME_CACHE_MAX_BYTES, getsizeof=lambda entry: entry[2])
+
+
+def _build_frame(rows):
+    return pd.DataFrame.from_records(rows, columns=FRAME_COLUMNS).astype(FRAME_DTYPES)
+
+
+def _patched(frame, changed, deleted):
+    # Cached frames may be in use by other sessions, so the patch builds a
+    # new frame instead of editing the old one
+    stale_ids = set(deleted).union(row[0] for row in changed)
+    patched = frame[~frame["id"].isin(stale_ids)]
+    if changed:
+        # Concatenating categoricals with different categories gives object
+        # columns, hence the astype
+        patched = pd.concat([patched, _build_frame(changed)], ignore_index=True).astype(FRAME_DTYPES)
+        patched = patched.sort_values(["date", "id"], ascending=False)
+    # Drop categories only the removed rows used, so long-lived frames do not
+    # grow (and stay correctly sized for the cache budget)
+    return patched.assign(**{
+        column: patched[column].cat.remove_unused_categories()
+        for column, dtype in FRAME_DTYPES.items()
+        if dtype == "category"
+    }).reset_index(drop=True)
+
+
+@instrumented
+def get_transactions_frame(user_id):
+    """All of the user's transactions as a DataFrame, newest first.
+
+    Frames are shared across sessions and reused while the user's
+    "transactions" version in data_versions is unchanged, so a cache hit
+    costs one primary-key lookup. An outdated frame is patched with
+    get_transaction_changes() rather than reloaded, so only the rows
+    written since travel over the wire, unless the deletions it needs have
+    been pruned. Treat the frame as read-only.
+    """
+    version = get_data_versions(user_id).get("transactions", 0)
+    with _lock:
+        entry = _frames.get(user_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    frame = None
+    if entry is not None:
+        try:
+            version, changed, deleted = get_transaction_changes(user_id, entry[0])
+        except TransactionChangesExpired:
+            pass
+        else:
+            frame = _patched(entry[1], changed, deleted)
+    if frame is None:
+        # The version is read before the rows: a write in between leaves a
+        # frame newer than its version, which is harmless since patches are
+        # idempotent
+        frame = _build_frame(iter_transactions(user_id))
+    size = int(frame.memory_usage(deep=True).sum())
+    with _lock:
+        current = _frames.get(user_id)
+        # Never replace a frame loaded at a newer version by another thread
+        if size <= _frames.maxsize and (current is None or current[0] <= version):
+            _frames[user_id] = (version, frame, size)
+    return frame
+
+
+def frame_cache_stats():
+    with _lock:
+        return {"users": len(_frames), "bytes": _frames.currsize, "max_bytes": _frames.maxsize}
+
+
+def clear_frame_cache():
+    with _lock:
+        _frames.clear()
@@ -0,0 +1,169 @@
+import argparse
+import csv
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from db.crud import add_transaction_chunks, get_categories
+
+IMPORT_CHUNK_SIZE = 5000
+DEFAULT_DATE_FORMAT = "%Y-%m-%d"
+DEFAULT_CATEGORY = "Others"
+# transactions.amount is NUMERIC(10, 2)
+MAX_AMOUNT = Decimal("1e8")
+
+# Transaction field -> CSV column header. Only date and amount are required;
+# without a type column the sign of the amount decides Income/Expense.
+DEFAULT_COLUMN_MAP = {
+    "date": "date",
+    "amount": "amount",
+    "type": "type",
+    "category": "category",
+    "description": "description",
+}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def _parse_amount(value):
+    cleaned = value.replace(",", "").replace("RM", "").strip()
+    negative = cleaned.startswith("(") and cleaned.endswith(")")
+    if negative:
+        cleaned = cleaned[1:-1]
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {value!r}") from None
+    # Decimal accepts NaN and Infinity, which the database would store or reject mid-import
+    if not amount.is_finite() or abs(amount) >= MAX_AMOUNT:
+        raise ValueError(f"invalid amount {value!r}")
+    return -amount if negative else amount
+
+
+def _parse_row(record, column_map, date_format, category_ids, default_category_id):
+    def field(name):
+        column = column_map.get(name)
+        return (record.get(column) or "").strip() if column else ""
+
+    tx_date = datetime.strptime(field("date"), date_format).date()
+    amount = _parse_amount(field("amount"))
+
+    tx_type = field("type").capitalize()
+    if tx_type not in ("Income", "Expense"):
+        tx_type = "Expense" if amount < 0 else "Income"
+
+    category_id = category_ids.get(field("category").lower(), default_category_id)
+    description = field("description") or None
+
+    return (tx_date, abs(amount), tx_type, category_id, description, None)
+
+
+@contextmanager
+def _reading(reader):
+    # Undecodable bytes and malformed CSV surface while iterating the reader
+    try:
+        yield
+    except UnicodeDecodeError as e:
+        raise ImportFormatError("The file is not UTF-8 encoded") from e
+    except csv.Error as e:
+        raise ImportFormatError(f"Line {reader.line_num}: {e}") from e
+
+
+def parse_rows(reader, column_map, date_format, category_ids, default_category_id):
+    """Yield staging rows from csv.DictReader records, one at a time."""
+    with _reading(reader):
+        for record in reader:
+            try:
+                yield _parse_row(record, column_map, date_format, category_ids, default_category_id)
+            except ValueError as e:
+                raise ImportFormatError(f"Line {reader.line_num}: {e}") from e
+
+
+def import_csv(
+    user_id,
+    fileobj,
+    column_map=None,
+    date_format=DEFAULT_DATE_FORMAT,
+    default_category=DEFAULT_CATEGORY,
+    chunk_size=IMPORT_CHUNK_SIZE,
+    skip_duplicates=True,
+):
+    """Stream a CSV statement into the user's transactions.
+
+    The file is read and COPYed into a staging table chunk_size rows at a
+    time, then merged in one statement, so memory use does not grow with
+    the file. Either every row is imported or none is. Rows the user
+    already has (same fingerprint) are skipped unless skip_duplicates is
+    False. Returns (imported, skipped).
+    """
+    column_map = {**DEFAULT_COLUMN_MAP, **(column_map or {})}
+    category_ids = {name.lower(): cid for cid, name in get_categories()}
+    default_category_id = category_ids[default_category.lower()]
+
+    reader = csv.DictReader(fileobj)
+    with _reading(reader):
+        fieldnames = reader.fieldnames
+    if not fieldnames:
+        raise ImportFormatError("The file is empty or has no header row")
+    unmapped = [name for name in ("date", "amount") if not column_map[name]]
+    if unmapped:
+        raise ImportFormatError(f"No column given for: {', '.join(unmapped)}")
+    missing = [
+        column_map[name] for name in ("date", "amount")
+        if column_map[name] not in fieldnames
+    ]
+    if missing:
+        raise ImportFormatError(f"Missing column(s): {', '.join(missing)}")
+
+    rows = parse_rows(reader, column_map, date_format, category_ids, default_category_id)
+
+    # Lists of chunk_size rows until the file runs out
+    chunks = iter(lambda: list(islice(rows, chunk_size)), [])
+    imported, staged = add_transaction_chunks(
+        user_id, chunks, skip_duplicates=skip_duplicates, return_ids=False, use_copy=True
+    )
+    return imported, staged - imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a CSV bank statement")
+    parser.add_argument("path", help="CSV file to import")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--date-format", default=DEFAULT_DATE_FORMAT)
+    parser.add_argument("--default-category", default=DEFAULT_CATEGORY)
+    parser.add_argument(
+        "--keep-duplicates",
+        action="store_true",
+        help="Import rows even if an identical transaction already exists"
+    )
+    parser.add_argument(
+        "--column",
+        action="append",
+        default=[],
+        metavar="FIELD=HEADER",
+        help="Map a transaction field (date, amount, type, category, description) to a CSV header"
+    )
+    args = parser.parse_args()
+
+    column_map = {}
+    for mapping in args.column:
+        field, _, header = mapping.partition("=")
+        column_map[field.strip()] = header.strip()
+
+    with open(args.path, encoding="utf-8-sig", newline="") as f:
+        imported, skipped = import_csv(
+            args.user_id,
+            f,
+            column_map=column_map,
+            date_format=args.date_format,
+            default_category=args.default_category,
+            skip_duplicates=not args.keep_duplicates,
+        )
+    print(f"Imported {imported} transaction(s), skipped {skipped} duplicate(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import json
+import logging
+import select
+import threading
+import time
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from db.cache import invalidate, invalidate_all
+from db.crud import DATA_CHANGES_CHANNEL
+from db.database import DB_CONFIG
+
+# Seconds without a notification before the connection is checked
+LISTENER_PING_INTERVAL = 60
+# Seconds to wait before reconnecting after the connection is lost
+LISTENER_RETRY_DELAY = 5
+
+log = logging.getLogger("money_tracker.listener")
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start_listener():
+    """Start this process's data-change listener thread, if not running.
+
+    The thread LISTENs on DATA_CHANGES_CHANNEL with its own connection and
+    evicts the in-process cache entries for every (user_id, entity) another
+    process (or this one) changes. Safe to call on every Streamlit rerun.
+    """
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="data-changes-listener", daemon=True)
+            _thread.start()
+
+
+def _run():
+    while True:
+        try:
+            _listen()
+        except psycopg2.Error as e:
+            log.warning("data change listener disconnected: %s", e)
+        time.sleep(LISTENER_RETRY_DELAY)
+
+
+def _listen():
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {DATA_CHANGES_CHANNEL}")
+        # Changes made while we were not listening were never delivered
+        invalidate_all()
+
+        while True:
+            if select.select([conn], [], [], LISTENER_PING_INTERVAL) == ([], [], []):
+                # Nothing for a while; make sure the connection is still alive
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            conn.poll()
+            while conn.notifies:
+                _handle(conn.notifies.pop(0).payload)
+    finally:
+        conn.close()
+
+
+def _handle(payload):
+    try:
+        change = json.loads(payload)
+        entity, user_id = change["entity"], change["user_id"]
+    except (ValueError, KeyError, TypeError):
+        log.warning("ignoring malformed data change notification: %r", payload)
+        return
+    invalidate(entity, user_id)
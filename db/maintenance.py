@@ -0,0 +1,52 @@
+import argparse
+
+from db.crud import (
+    TOMBSTONE_RETENTION_DAYS,
+    prune_transaction_tombstones,
+    rebuild_monthly_rollups,
+    reconcile_savings_goals,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Money Tracker maintenance tasks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = subparsers.add_parser(
+        "reconcile-goals",
+        help="Rebuild savings_goals.current_amount from transactions"
+    )
+    reconcile.add_argument("--user-id", type=int, help="Only this user's goals")
+
+    rollups = subparsers.add_parser(
+        "rebuild-rollups",
+        help="Recompute monthly_rollups from transactions"
+    )
+    rollups.add_argument("--user-id", type=int, help="Only this user's rollups")
+
+    prune = subparsers.add_parser(
+        "prune-tombstones",
+        help="Delete old transaction_tombstones rows"
+    )
+    prune.add_argument(
+        "--days",
+        type=int,
+        default=TOMBSTONE_RETENTION_DAYS,
+        help=f"Keep tombstones newer than this many days (default {TOMBSTONE_RETENTION_DAYS})"
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "reconcile-goals":
+        count = reconcile_savings_goals(args.user_id)
+        print(f"Reconciled {count} savings goal(s)")
+    elif args.command == "rebuild-rollups":
+        count = rebuild_monthly_rollups(args.user_id)
+        print(f"Wrote {count} monthly rollup row(s)")
+    elif args.command == "prune-tombstones":
+        count = prune_transaction_tombstones(args.days)
+        print(f"Pruned {count} transaction tombstone(s)")
+
+
+if __name__ == "__main__":
+    main()
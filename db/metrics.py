@@ -0,0 +1,180 @@
+import inspect
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from psycopg2.extensions import cursor as base_cursor
+
+# Calls slower than this (wall time, milliseconds) go to the slow-query log
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 200))
+
+slow_query_log = logging.getLogger("money_tracker.slow_queries")
+
+# Per-thread state: the call being measured and the current rerun's stats.
+# Streamlit runs each session's script on its own thread.
+_local = threading.local()
+
+_process_lock = threading.Lock()
+_process_stats = {}
+
+
+def _empty_stats():
+    return {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "acquire_ms": 0.0}
+
+
+def _add_call(stats, name, elapsed_ms, call):
+    entry = stats.setdefault(name, _empty_stats())
+    entry["calls"] += 1
+    entry["total_ms"] += elapsed_ms
+    entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+    entry["rows"] += call["rows"]
+    entry["acquire_ms"] += call["acquire_ms"]
+
+
+def _shape(value):
+    # Describe a parameter without logging its contents
+    if value is None:
+        return "None"
+    if isinstance(value, (list, tuple, set, dict, str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def _record(name, elapsed_ms, call, args, kwargs):
+    with _process_lock:
+        _add_call(_process_stats, name, elapsed_ms, call)
+
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        _add_call(rerun, name, elapsed_ms, call)
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        shapes = [_shape(a) for a in args]
+        shapes += [f"{key}={_shape(value)}" for key, value in sorted(kwargs.items())]
+        slow_query_log.warning(
+            "slow query %s: %.1f ms, %d rows, %.1f ms acquiring connection, params (%s)",
+            name, elapsed_ms, call["rows"], call["acquire_ms"], ", ".join(shapes)
+        )
+
+
+def instrumented(func):
+    """Record wall time, rows and connection wait for every call of func.
+
+    Stats are aggregated per process and, after start_rerun(), per rerun.
+    Generator functions are measured from the first to the last row.
+    """
+    name = func.__name__
+
+    if inspect.isgeneratorfunction(func):
+        @wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            call = {"rows": 0, "acquire_ms": 0.0}
+            start = time.perf_counter()
+            try:
+                for row in _measured(func(*args, **kwargs), call):
+                    call["rows"] += 1
+                    yield row
+            finally:
+                _record(name, (time.perf_counter() - start) * 1000, call, args, kwargs)
+
+        return generator_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        outer = getattr(_local, "call", None)
+        call = {"rows": 0, "acquire_ms": 0.0}
+        _local.call = call
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.call = outer
+            _record(name, (time.perf_counter() - start) * 1000, call, args, kwargs)
+
+    return wrapper
+
+
+def _measured(generator, call):
+    # Attribute connection waits inside the generator's own steps to `call`
+    while True:
+        outer = getattr(_local, "call", None)
+        _local.call = call
+        try:
+            row = next(generator)
+        except StopIteration:
+            return
+        finally:
+            _local.call = outer
+        yield row
+
+
+def note_acquire(elapsed_ms):
+    call = getattr(_local, "call", None)
+    if call is not None:
+        call["acquire_ms"] += elapsed_ms
+
+
+def note_rows(count):
+    call = getattr(_local, "call", None)
+    if call is not None and count > 0:
+        call["rows"] += count
+
+
+class InstrumentedCursor(base_cursor):
+    """Cursor that reports the rows each statement returned or changed."""
+
+    def execute(self, query, vars=None):
+        result = super().execute(query, vars)
+        # Named cursors report -1 until rows are fetched; generators count those
+        if self.name is None:
+            note_rows(self.rowcount)
+        return result
+
+    def copy_expert(self, sql, file, size=8192):
+        result = super().copy_expert(sql, file, size)
+        note_rows(self.rowcount)
+        return result
+
+
+def start_rerun():
+    """Begin collecting stats for a new Streamlit rerun on this thread."""
+    _local.rerun = {}
+    _local.rerun_start = time.perf_counter()
+    _local.sections = {}
+    _local.current_section = None
+
+
+def rerun_stats():
+    return {name: dict(entry) for name, entry in getattr(_local, "rerun", {}).items()}
+
+
+def rerun_elapsed_ms():
+    start = getattr(_local, "rerun_start", None)
+    return 0.0 if start is None else (time.perf_counter() - start) * 1000
+
+
+def mark_section(name):
+    """End the current page section (if any) and start timing `name`.
+
+    Pass None to just close the current section.
+    """
+    now = time.perf_counter()
+    sections = getattr(_local, "sections", None)
+    if sections is None:
+        return
+    current = _local.current_section
+    if current is not None:
+        section_name, started = current
+        sections[section_name] = sections.get(section_name, 0.0) + (now - started) * 1000
+    _local.current_section = None if name is None else (name, now)
+
+
+def section_times():
+    return dict(getattr(_local, "sections", {}))
+
+
+def process_stats():
+    with _process_lock:
+        return {name: dict(entry) for name, entry in _process_stats.items()}
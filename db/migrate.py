@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from db.database import get_connection
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# Arbitrary key so two processes never apply migrations at the same time
+MIGRATION_LOCK_ID = 7354201
+
+
+def get_migration_files():
+    # Applied in file name order: 0001_..., 0002_..., ...
+    return sorted(MIGRATIONS_DIR.glob("*.sql"))
+
+
+def migrate():
+    """Apply every pending migration, each in its own transaction."""
+    applied_now = []
+
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        try:
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version TEXT PRIMARY KEY,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            cur.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cur.fetchall()}
+            conn.commit()
+
+            for path in get_migration_files():
+                version = path.stem
+                if version in applied:
+                    continue
+
+                cur.execute(path.read_text())
+                cur.execute(
+                    "INSERT INTO schema_migrations (version) VALUES (%s)",
+                    (version,)
+                )
+                conn.commit()
+                applied_now.append(version)
+        finally:
+            conn.rollback()
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+
+    return applied_now
+
+
+if __name__ == "__main__":
+    applied = migrate()
+    if applied:
+        for version in applied:
+            print(f"Applied: {version}")
+    else:
+        print("Database is up to date")
@@ -0,0 +1,51 @@
+-- Base schema, matching what db/sql_query.txt used to create by hand.
+-- Everything is IF NOT EXISTS so databases set up before migrations
+-- existed can adopt the runner without being rebuilt.
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(50) UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS savings_goals (
+    id SERIAL PRIMARY KEY,
+    goal_name VARCHAR(100) NOT NULL,
+    target_amount DOUBLE PRECISION NOT NULL,
+    current_amount DOUBLE PRECISION DEFAULT 0,
+    start_date DATE NOT NULL,
+    target_date DATE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id SERIAL PRIMARY KEY,
+    date DATE NOT NULL,
+    amount NUMERIC(10, 2) NOT NULL,
+    savings_goal_id INT,
+    type VARCHAR(10) CHECK (type IN ('Income', 'Expense')) NOT NULL,
+    category_id INT,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_savings_goal FOREIGN KEY (savings_goal_id)
+        REFERENCES savings_goals(id) ON DELETE SET NULL,
+    CONSTRAINT fk_category FOREIGN KEY (category_id)
+        REFERENCES categories(id)
+);
+
+INSERT INTO categories (name)
+VALUES
+('Commitment'),
+('Savings'),
+('Shopping'),
+('Food'),
+('Transportation'),
+('Subscription'),
+('Others')
+ON CONFLICT (name) DO NOTHING;
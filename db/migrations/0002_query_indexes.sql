@@ -0,0 +1,21 @@
+-- Indexes backing the queries in db/crud.py.
+-- users.email is already covered by its UNIQUE constraint.
+
+-- get_transactions / get_transactions_page: ORDER BY date DESC, id DESC,
+-- and the date range in get_summary
+CREATE INDEX IF NOT EXISTS idx_transactions_date_id
+    ON transactions (date DESC, id DESC);
+
+-- get_savings_total_by_goal(s): most transactions have no goal, so only
+-- index the ones that do
+CREATE INDEX IF NOT EXISTS idx_transactions_savings_goal
+    ON transactions (savings_goal_id)
+    WHERE savings_goal_id IS NOT NULL;
+
+-- JOIN categories and get_savings_total
+CREATE INDEX IF NOT EXISTS idx_transactions_category
+    ON transactions (category_id);
+
+-- get_savings_goals: ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS idx_savings_goals_created_at
+    ON savings_goals (created_at DESC);
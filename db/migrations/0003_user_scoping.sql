@@ -0,0 +1,19 @@
+-- Scope transactions and savings goals to their owner.
+-- Rows created before this migration keep a NULL user_id and are not shown
+-- to anyone until they are assigned, e.g.
+--   UPDATE transactions SET user_id = <id> WHERE user_id IS NULL;
+
+ALTER TABLE transactions
+    ADD COLUMN IF NOT EXISTS user_id INT REFERENCES users(id) ON DELETE CASCADE;
+
+ALTER TABLE savings_goals
+    ADD COLUMN IF NOT EXISTS user_id INT REFERENCES users(id) ON DELETE CASCADE;
+
+-- Every listing now filters on user_id first, so lead the indexes with it
+DROP INDEX IF EXISTS idx_transactions_date_id;
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date_id
+    ON transactions (user_id, date DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_savings_goals_created_at;
+CREATE INDEX IF NOT EXISTS idx_savings_goals_user_created_at
+    ON savings_goals (user_id, created_at DESC);
@@ -0,0 +1,9 @@
+-- current_amount is now kept up to date by the transaction writes in
+-- db/crud.py; bring existing goals in line with their contributions once.
+UPDATE savings_goals g
+SET current_amount = COALESCE((
+    SELECT SUM(t.amount)
+    FROM transactions t
+    WHERE t.savings_goal_id = g.id
+    AND t.type = 'Expense'
+), 0);
@@ -0,0 +1,27 @@
+-- Per-user monthly totals by category and type, kept up to date by the
+-- transaction writes in db/crud.py so summaries never scan raw history.
+
+-- Rollups are keyed by category, so every transaction needs one
+UPDATE transactions
+SET category_id = (SELECT id FROM categories WHERE name = 'Others')
+WHERE category_id IS NULL;
+
+ALTER TABLE transactions ALTER COLUMN category_id SET NOT NULL;
+
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    category_id INT NOT NULL REFERENCES categories(id),
+    type VARCHAR(10) NOT NULL,
+    total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month, category_id, type)
+);
+
+INSERT INTO monthly_rollups (user_id, month, category_id, type, total, count)
+SELECT user_id, date_trunc('month', date)::date, category_id, type, SUM(amount), COUNT(*)
+FROM transactions
+WHERE user_id IS NOT NULL
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (user_id, month, category_id, type) DO UPDATE
+SET total = EXCLUDED.total, count = EXCLUDED.count;
@@ -0,0 +1,27 @@
+-- A normalized content hash per transaction, so imports can skip rows that
+-- are already stored with one anti-join instead of per-row lookups.
+-- Normalization: ISO date, amount to two decimals, type, and the
+-- description lower-cased with whitespace collapsed and trimmed.
+
+CREATE OR REPLACE FUNCTION transaction_fingerprint(
+    tx_date DATE,
+    amount NUMERIC,
+    tx_type TEXT,
+    description TEXT
+) RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT md5(
+        to_char(tx_date, 'YYYY-MM-DD') || '|' ||
+        round(amount, 2)::text || '|' ||
+        tx_type || '|' ||
+        lower(btrim(regexp_replace(coalesce(description, ''), '\s+', ' ', 'g')))
+    )
+$$;
+
+ALTER TABLE transactions
+    ADD COLUMN IF NOT EXISTS fingerprint TEXT
+    GENERATED ALWAYS AS (transaction_fingerprint(date, amount, type, description)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_fingerprint
+    ON transactions (user_id, fingerprint);
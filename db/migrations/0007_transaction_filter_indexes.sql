@@ -0,0 +1,10 @@
+-- Indexes for the filtered transaction listing. Each keeps the
+-- (date DESC, id DESC) tail so a filtered page is still an index range
+-- read in keyset order. Savings-goal filters use the partial index from
+-- 0002; amount and description are checked on the rows these narrow to.
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_type_date_id
+    ON transactions (user_id, type, date DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_category_date_id
+    ON transactions (user_id, category_id, date DESC, id DESC);
@@ -0,0 +1,9 @@
+-- Trigram index for searching transaction descriptions. btree_gin lets the
+-- same GIN index lead with user_id, so a search only touches one user's
+-- rows. Both extensions are trusted, so the database owner can create them.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_description_trgm
+    ON transactions USING gin (user_id, description gin_trgm_ops);
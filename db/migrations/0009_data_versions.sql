@@ -0,0 +1,11 @@
+-- Per-user version counters, bumped by the writes in db/crud.py in the same
+-- transaction as the change. Comparing a version is one primary-key lookup,
+-- so readers can tell whether something they cached is still current
+-- without fetching the data again.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    entity TEXT NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, entity)
+);
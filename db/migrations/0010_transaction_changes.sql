@@ -0,0 +1,18 @@
+-- Change tracking for get_transaction_changes. Every write stamps the rows
+-- it inserts or updates with the user's new "transactions" version from
+-- data_versions, and deletes leave a tombstone at that version, so a
+-- reader holding version N can fetch just what changed after it.
+-- Rows written before this migration keep version 0.
+
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_row_version
+    ON transactions (user_id, row_version);
+
+CREATE TABLE IF NOT EXISTS transaction_tombstones (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    version BIGINT NOT NULL,
+    transaction_id INT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, version, transaction_id)
+);
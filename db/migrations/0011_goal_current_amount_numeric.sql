@@ -0,0 +1,15 @@
+-- current_amount is a running total of add/subtract deltas (db/crud.py),
+-- which leaves float residue in DOUBLE PRECISION: a goal whose
+-- contributions were all deleted could end up at 2.8e-17 instead of 0.
+-- Keep it exact, like monthly_rollups.total, and drop any residue already
+-- there by recomputing it from the transactions.
+
+ALTER TABLE savings_goals ALTER COLUMN current_amount TYPE NUMERIC(14, 2);
+
+UPDATE savings_goals g
+SET current_amount = COALESCE((
+    SELECT SUM(t.amount)
+    FROM transactions t
+    WHERE t.savings_goal_id = g.id
+    AND t.type = 'Expense'
+), 0);
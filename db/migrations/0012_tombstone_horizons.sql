@@ -0,0 +1,12 @@
+-- transaction_tombstones is pruned by `python -m db.maintenance
+-- prune-tombstones`. Each user's row here records the newest "transactions"
+-- version whose tombstones may be gone, so get_transaction_changes can tell
+-- a caller asking from before it to reload everything instead.
+
+CREATE TABLE IF NOT EXISTS transaction_tombstone_horizons (
+    user_id INT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    version BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_transaction_tombstones_deleted_at
+    ON transaction_tombstones (deleted_at);
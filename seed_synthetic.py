@@ -0,0 +1,190 @@
+"""Generate realistic synthetic ledgers for load testing.
+
+Creates N users, each with a few savings goals and M years of transactions
+(monthly salary, recurring bills, day-to-day spending per category and goal
+contributions), loaded with COPY through add_transaction_chunks. The same
+arguments always produce the same data.
+
+    python seed_synthetic.py --users 1000 --years 5 --seed 42
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from dateutil.relativedelta import relativedelta
+from psycopg2.extras import execute_values
+
+from auth.utils import hash_password
+from db.crud import add_transaction_chunks, get_categories
+from db.database import get_connection
+
+DEFAULT_END_DATE = "2025-12-31"
+DEFAULT_PASSWORD = "password"
+# Generated rows are COPYed this many at a time
+SEED_CHUNK_SIZE = 5000
+
+MERCHANTS = {
+    "Food": ["GrabFood", "McDonald's", "Mamak Corner", "Starbucks", "99 Speedmart", "Tealive", "KFC", "Foodpanda"],
+    "Shopping": ["Shopee", "Lazada", "Uniqlo", "IKEA", "Mr DIY", "Watsons", "Aeon"],
+    "Transportation": ["Grab ride", "Touch 'n Go reload", "Petronas", "Shell", "LRT"],
+    "Others": ["Pharmacy", "Barber", "Gift", "Donation", "Cinema"],
+}
+SUBSCRIPTIONS = [("Netflix", 55), ("Spotify", 16), ("iCloud", 5), ("YouTube Premium", 24), ("Gym membership", 120)]
+GOAL_NAMES = ["Emergency Fund", "Holiday", "New Laptop", "Wedding", "House Deposit", "Car"]
+
+
+def _money(value):
+    return Decimal(value).quantize(Decimal("0.01"))
+
+
+def _month_starts(start, end):
+    month = start.replace(day=1)
+    while month <= end:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def generate_goals(rng, start, end):
+    goals = []
+    for name in rng.sample(GOAL_NAMES, rng.randint(1, 4)):
+        goal_start = start + timedelta(days=rng.randint(0, max((end - start).days - 60, 0)))
+        goal_end = goal_start + timedelta(days=rng.randint(180, 1095))
+        goals.append((name, _money(rng.choice([1000, 3000, 5000, 10000, 20000, 50000])), goal_start, goal_end))
+    return goals
+
+
+def generate_transactions(rng, start, end, categories, goals):
+    """Yield (date, amount, type, category_id, description, savings_goal_id) rows."""
+    salary = rng.randint(30, 120) * 100
+    payday = rng.randint(25, 28)
+    rent = _money(salary * rng.uniform(0.2, 0.35))
+    subscriptions = rng.sample(SUBSCRIPTIONS, rng.randint(1, len(SUBSCRIPTIONS)))
+    daily_meals = rng.uniform(1, 3)
+
+    for month in _month_starts(start, end):
+        pay_date = month.replace(day=payday)
+        if start <= pay_date <= end:
+            yield (pay_date, _money(salary * rng.uniform(0.98, 1.05)), "Income", categories["Others"], "Salary", None)
+        if rng.random() < 0.1:
+            bonus_date = month + timedelta(days=rng.randint(0, 27))
+            if start <= bonus_date <= end:
+                yield (bonus_date, _money(salary * rng.uniform(0.2, 1.0)), "Income", categories["Others"], "Bonus", None)
+
+        if start <= month <= end:
+            yield (month, rent, "Expense", categories["Commitment"], "Rent", None)
+        for name, price in subscriptions:
+            bill_date = month + timedelta(days=rng.randint(0, 27))
+            if start <= bill_date <= end:
+                yield (bill_date, _money(price), "Expense", categories["Subscription"], name, None)
+
+        for goal_id, goal_start, goal_end, monthly in goals:
+            contribution_date = pay_date + timedelta(days=rng.randint(0, 3))
+            if goal_start <= contribution_date <= min(goal_end, end) and rng.random() < 0.85:
+                amount = _money(monthly * rng.uniform(0.5, 1.5))
+                yield (contribution_date, amount, "Expense", categories["Savings"], "Savings contribution", goal_id)
+
+    day = start
+    while day <= end:
+        for _ in range(int(rng.expovariate(1 / daily_meals))):
+            yield (day, _money(rng.lognormvariate(2.5, 0.5)), "Expense", categories["Food"], rng.choice(MERCHANTS["Food"]), None)
+        if rng.random() < 0.6:
+            yield (day, _money(rng.lognormvariate(2.3, 0.6)), "Expense", categories["Transportation"], rng.choice(MERCHANTS["Transportation"]), None)
+        if rng.random() < 0.15:
+            yield (day, _money(rng.lognormvariate(4.0, 0.9)), "Expense", categories["Shopping"], rng.choice(MERCHANTS["Shopping"]), None)
+        if rng.random() < 0.05:
+            yield (day, _money(rng.lognormvariate(3.5, 0.8)), "Expense", categories["Others"], rng.choice(MERCHANTS["Others"]), None)
+        day += timedelta(days=1)
+
+
+def create_users(emails, password):
+    # Existing emails are left alone so reruns only add what is missing
+    password_hash = hash_password(password)
+    with get_connection() as conn, conn.cursor() as cur:
+        created = execute_values(
+            cur,
+            """
+            INSERT INTO users (email, password_hash) VALUES %s
+            ON CONFLICT (email) DO NOTHING
+            RETURNING id, email
+            """,
+            [(email, password_hash) for email in emails],
+            fetch=True
+        )
+        conn.commit()
+    return dict((email, user_id) for user_id, email in created)
+
+
+def create_goals(user_id, goals):
+    with get_connection() as conn, conn.cursor() as cur:
+        ids = execute_values(
+            cur,
+            """
+            INSERT INTO savings_goals (user_id, goal_name, target_amount, start_date, target_date)
+            VALUES %s
+            RETURNING id
+            """,
+            [(user_id,) + goal for goal in goals],
+            fetch=True
+        )
+        conn.commit()
+    return [row[0] for row in ids]
+
+
+def seed(users, years, seed_value, end_date, email_prefix, password=DEFAULT_PASSWORD):
+    categories = {name: cid for cid, name in get_categories()}
+    # relativedelta clamps Feb 29 to Feb 28 in non-leap years
+    start_date = end_date - relativedelta(years=years) + timedelta(days=1)
+
+    emails = [f"{email_prefix}{i}@example.com" for i in range(users)]
+    user_ids = create_users(emails, password)
+
+    total = 0
+    for i, email in enumerate(emails):
+        if email not in user_ids:
+            continue
+        user_id = user_ids[email]
+        # One generator per user, so a user's data does not depend on the others
+        rng = random.Random(f"{seed_value}:{i}")
+
+        goals = generate_goals(rng, start_date, end_date)
+        goal_ids = create_goals(user_id, goals)
+        goal_plans = [
+            (goal_id, start, end, float(target) / max((end - start).days / 30, 1))
+            for goal_id, (name, target, start, end) in zip(goal_ids, goals)
+        ]
+
+        rows = generate_transactions(rng, start_date, end_date, categories, goal_plans)
+        chunks = iter(lambda: list(islice(rows, SEED_CHUNK_SIZE)), [])
+        # A user's history is usually below BULK_COPY_THRESHOLD, so COPY is forced
+        inserted, _ = add_transaction_chunks(user_id, chunks, return_ids=False, use_copy=True)
+        total += inserted
+
+        if (i + 1) % 100 == 0:
+            print(f"{i + 1}/{users} users, {total} transactions")
+
+    return len(user_ids), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic users and transactions")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", default=DEFAULT_END_DATE, help="Last day of generated history (YYYY-MM-DD)")
+    parser.add_argument("--email-prefix", default="synthetic")
+    args = parser.parse_args()
+
+    created, total = seed(
+        args.users,
+        args.years,
+        args.seed,
+        date.fromisoformat(args.end_date),
+        args.email_prefix,
+    )
+    print(f"Created {created} user(s) with {total} transaction(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import csv
+import io
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from db.importer import (
+    DEFAULT_COLUMN_MAP,
+    ImportFormatError,
+    _parse_amount,
+    _parse_row,
+    parse_rows,
+)
+
+CATEGORY_IDS = {"food": 1, "salary": 2, "others": 3}
+DEFAULT_CATEGORY_ID = 3
+
+
+def parse(record, column_map=DEFAULT_COLUMN_MAP, date_format="%Y-%m-%d"):
+    return _parse_row(record, column_map, date_format, CATEGORY_IDS, DEFAULT_CATEGORY_ID)
+
+
+class ParseAmountTest(unittest.TestCase):
+    def test_plain_and_formatted_amounts(self):
+        self.assertEqual(_parse_amount("12.50"), Decimal("12.50"))
+        self.assertEqual(_parse_amount(" RM 1,234.56 "), Decimal("1234.56"))
+        self.assertEqual(_parse_amount("-3"), Decimal("-3"))
+
+    def test_parentheses_are_negative(self):
+        self.assertEqual(_parse_amount("(1,000.00)"), Decimal("-1000.00"))
+
+    def test_rejects_text(self):
+        for value in ("", "abc", "12..5"):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                _parse_amount(value)
+
+    def test_rejects_non_finite(self):
+        for value in ("NaN", "sNaN", "Infinity", "-inf"):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                _parse_amount(value)
+
+    def test_rejects_amounts_too_large_to_store(self):
+        self.assertEqual(_parse_amount("99999999.99"), Decimal("99999999.99"))
+        for value in ("100000000", "-100000000", "1e12"):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                _parse_amount(value)
+
+
+class ParseRowTest(unittest.TestCase):
+    def test_type_column(self):
+        row = parse({
+            "date": "2024-03-01",
+            "amount": "2500",
+            "type": "income",
+            "category": "Salary",
+            "description": "March pay",
+        })
+        self.assertEqual(row, (date(2024, 3, 1), Decimal("2500"), "Income", 2, "March pay", None))
+
+    def test_sign_decides_type_without_type_column(self):
+        column_map = {**DEFAULT_COLUMN_MAP, "type": None}
+        expense = parse({"date": "2024-03-01", "amount": "-12.50"}, column_map)
+        income = parse({"date": "2024-03-01", "amount": "12.50"}, column_map)
+        self.assertEqual(expense[1:3], (Decimal("12.50"), "Expense"))
+        self.assertEqual(income[1:3], (Decimal("12.50"), "Income"))
+
+    def test_unknown_category_and_blank_description(self):
+        row = parse({"date": "2024-03-01", "amount": "5", "category": "Pets", "description": " "})
+        self.assertEqual(row[3], DEFAULT_CATEGORY_ID)
+        self.assertIsNone(row[4])
+
+    def test_date_format(self):
+        row = parse({"date": "01/03/2024", "amount": "5"}, date_format="%d/%m/%Y")
+        self.assertEqual(row[0], date(2024, 3, 1))
+
+    def test_invalid_values_raise_value_error(self):
+        for record in (
+            {"date": "2024-13-01", "amount": "5"},
+            {"date": "2024-03-01", "amount": "NaN", "type": "Expense"},
+            {"date": "2024-03-01", "amount": "NaN"},
+        ):
+            with self.subTest(record=record), self.assertRaises(ValueError):
+                parse(record)
+
+
+class ParseRowsTest(unittest.TestCase):
+    def rows(self, data):
+        reader = csv.DictReader(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline=""))
+        return list(parse_rows(reader, DEFAULT_COLUMN_MAP, "%Y-%m-%d", CATEGORY_IDS, DEFAULT_CATEGORY_ID))
+
+    def test_parses_every_record(self):
+        rows = self.rows(b"\xef\xbb\xbfdate,amount\n2024-03-01,-5\n2024-03-02,7\n")
+        self.assertEqual([row[:3] for row in rows], [
+            (date(2024, 3, 1), Decimal("5"), "Expense"),
+            (date(2024, 3, 2), Decimal("7"), "Income"),
+        ])
+
+    def test_bad_value_reports_its_line(self):
+        with self.assertRaisesRegex(ImportFormatError, "^Line 3: "):
+            self.rows(b"date,amount\n2024-03-01,5\n2024-03-02,NaN\n")
+
+    def test_non_utf8_file(self):
+        with self.assertRaisesRegex(ImportFormatError, "not UTF-8"):
+            self.rows("date,amount,description\n2024-03-01,5,Café\n".encode("cp1252"))
+
+    def test_malformed_csv(self):
+        reader = csv.DictReader(io.StringIO('date,amount\n2024-03-01,"5\n'), strict=True)
+        with self.assertRaisesRegex(ImportFormatError, "^Line "):
+            list(parse_rows(reader, DEFAULT_COLUMN_MAP, "%Y-%m-%d", CATEGORY_IDS, DEFAULT_CATEGORY_ID))
+
+
+if __name__ == "__main__":
+    unittest.main()